@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+
+"""
+# benchmark.py
+
+Benchmark the Countdown solvers on reproducible workloads.
+
+Copyright 2022 Conway
+Licensed under the GNU General Public License v3.0 (GPL-3.0-only).
+This is free software with NO WARRANTY etc. etc., see LICENSE.
+
+The corpus of number draws and letter racks is generated
+from a seed, so that runs with the same seed measure the same work.
+Besides the random draws, the numbers corpus always includes
+some hard draws and some with many repeated numbers.
+
+Each workload runs through the public functions of `numbers.py`
+or `letters.py`, in a fresh worker process of its own,
+and records its time (the best of several repeats),
+throughput (items per second) and the peak resident memory of the process.
+Any setup, such as building an index, is timed separately
+and not included in the time (but is included in the peak memory).
+The results can be written to a JSON file, and compared against
+the results of an earlier run, reporting any workload whose time
+or peak memory has grown by more than a threshold.
+"""
+
+
+import argparse
+import cli
+import concurrent.futures
+import json
+import letters
+import numbers
+import platform
+import random
+import solvability
+import sys
+import time
+
+
+RESULTS_VERSION = 1
+
+NUMBERS_DRAWS_FIXED = [
+  # Hard draws
+  (952, [100, 75, 50, 25, 6, 3]),
+  (821, [100, 75, 50, 25, 9, 1]),
+  # Draws with many repeated numbers
+  (213, [75, 50, 2, 2, 5, 5]),
+  (371, [1, 1, 2, 2, 3, 3]),
+]
+
+LETTERS_RACKS_FIXED = [
+  'ahgroient',
+  'aeiouaeio',
+  'tsrnlmpdc',
+]
+
+VOWELS = 'aeiou'
+VOWEL_WEIGHTS = [15, 21, 13, 13, 5]
+CONSONANTS = 'bcdfghjklmnpqrstvwxyz'
+CONSONANT_WEIGHTS = [
+  2, 3, 6, 2, 3, 2, 1, 1, 5, 4, 8, 4, 1, 9, 9, 9, 1, 1, 1, 1, 1,
+]
+RACK_SIZE = 9
+
+TARGET_MIN = 100
+TARGET_MAX = 999
+
+SEED_DEFAULT = 2022
+DRAW_COUNT_DEFAULT = 4
+RACK_COUNT_DEFAULT = 20
+REPEATS_DEFAULT = 3
+THRESHOLD_DEFAULT = 0.1
+
+WORKLOAD_NAMES = [
+  'numbers-closest',
+  'numbers-first',
+  'numbers-target',
+  'numbers-table',
+  'letters-load',
+  'letters-scan',
+  'letters-signature',
+  'letters-counts',
+  'letters-dawg',
+]
+
+
+def generate_numbers_corpus(seed, draw_count):
+  """
+  Generate the (target, input number list) pairs of the numbers corpus.
+  
+  The fixed draws come first, followed by `draw_count` random draws
+  from the standard pool of `solvability.POOL`.
+  """
+  
+  generator = random.Random(seed)
+  
+  corpus = [
+    (target, list(input_number_list))
+      for target, input_number_list in NUMBERS_DRAWS_FIXED
+  ]
+  for _ in range(draw_count):
+    corpus.append(
+      (
+        generator.randint(TARGET_MIN, TARGET_MAX),
+        generator.sample(solvability.POOL, solvability.DRAW_SIZE),
+      )
+    )
+  
+  return corpus
+
+
+def generate_letters_corpus(seed, rack_count):
+  """
+  Generate the racks of the letters corpus.
+  
+  The fixed racks come first, followed by `rack_count` random racks
+  of 3 to 5 vowels, drawn with frequencies resembling those of the show.
+  """
+  
+  generator = random.Random(seed)
+  
+  corpus = list(LETTERS_RACKS_FIXED)
+  for _ in range(rack_count):
+    vowel_count = generator.randint(3, 5)
+    rack_letter_list = [
+      *generator.choices(VOWELS, VOWEL_WEIGHTS, k=vowel_count),
+      *generator.choices(
+        CONSONANTS,
+        CONSONANT_WEIGHTS,
+        k=RACK_SIZE - vowel_count,
+      ),
+    ]
+    generator.shuffle(rack_letter_list)
+    corpus.append(''.join(rack_letter_list))
+  
+  return corpus
+
+
+def prepare_workload(
+  workload_name,
+  numbers_corpus,
+  letters_corpus,
+  word_list_file_name,
+):
+  """
+  Prepare a workload, returning (item list, run function).
+  
+  The run function is called on each item of the list.
+  """
+  
+  if workload_name == 'numbers-closest':
+    def run(item):
+      target, input_number_list = item
+      numbers.compute_closest_expression_list(input_number_list, target, 30)
+    return numbers_corpus, run
+  
+  if workload_name == 'numbers-first':
+    def run(item):
+      target, input_number_list = item
+      numbers.compute_hit_set(input_number_list, target, 1)
+    return numbers_corpus, run
+  
+  if workload_name == 'numbers-target':
+    def run(item):
+      target, input_number_list = item
+      numbers.compute_target_hit_set(input_number_list, target)
+    return numbers_corpus, run
+  
+  if workload_name == 'numbers-table':
+    def run(item):
+      _, input_number_list = item
+      numbers.ReachabilityTable.compute(input_number_list)
+    return numbers_corpus, run
+  
+  if workload_name == 'letters-load':
+    def run(item):
+      letters.read_word_list(item)
+    return [word_list_file_name], run
+  
+  word_list = letters.read_word_list(word_list_file_name)
+  engine = workload_name.split('-', 1)[1]
+  
+  if engine == letters.ENGINE_SCAN:
+    word_index = None
+  else:
+    word_index = letters.WORD_INDEX_CLASS_FROM_ENGINE[engine](word_list)
+  
+  def run(item):
+    letters.compute_valid_word_list(
+      word_list,
+      letters.normalise_letters(item),
+      word_index,
+    )
+  
+  return letters_corpus, run
+
+
+def measure_workload(
+  workload_name,
+  numbers_corpus,
+  letters_corpus,
+  word_list_file_name,
+  repeats_count,
+):
+  """
+  Prepare and measure a workload, returning a dictionary of its results.
+  
+  This is done in a worker process of `run_benchmark`,
+  so that the peak memory is that of the workload alone.
+  """
+  
+  start_time = time.perf_counter()
+  item_list, run = \
+          prepare_workload(
+            workload_name,
+            numbers_corpus,
+            letters_corpus,
+            word_list_file_name,
+          )
+  setup_seconds = time.perf_counter() - start_time
+  
+  seconds = None
+  for _ in range(repeats_count):
+    start_time = time.perf_counter()
+    for item in item_list:
+      run(item)
+    elapsed_seconds = time.perf_counter() - start_time
+    if seconds is None or elapsed_seconds < seconds:
+      seconds = elapsed_seconds
+  
+  return {
+    'items': len(item_list),
+    'seconds': seconds,
+    'throughput': len(item_list) / seconds if seconds > 0 else None,
+    'peak_kib': cli.get_peak_memory_kib(),
+    'setup_seconds': setup_seconds,
+  }
+
+
+def run_benchmark(
+  workload_name_list,
+  seed=SEED_DEFAULT,
+  draw_count=DRAW_COUNT_DEFAULT,
+  rack_count=RACK_COUNT_DEFAULT,
+  repeats_count=REPEATS_DEFAULT,
+  word_list_file_name=letters.WORD_LIST_FILE_NAME_DEFAULT,
+):
+  """
+  Run the workloads, returning the results in their JSON form.
+  """
+  
+  numbers_corpus = generate_numbers_corpus(seed, draw_count)
+  letters_corpus = generate_letters_corpus(seed, rack_count)
+  
+  result_from_workload_name = {}
+  for workload_name in workload_name_list:
+    with concurrent.futures.ProcessPoolExecutor(1) as executor:
+      result_from_workload_name[workload_name] = \
+              executor.submit(
+                measure_workload,
+                workload_name,
+                numbers_corpus,
+                letters_corpus,
+                word_list_file_name,
+                repeats_count,
+              ).result()
+  
+  return {
+    'version': RESULTS_VERSION,
+    'python': platform.python_version(),
+    'seed': seed,
+    'draw_count': draw_count,
+    'rack_count': rack_count,
+    'repeats_count': repeats_count,
+    'results': result_from_workload_name,
+  }
+
+
+def compare_results(results, baseline_results, threshold):
+  """
+  Compare results against a baseline, returning a list of regressions.
+  
+  A regression is a workload (present in both) whose time or peak memory
+  exceeds that of the baseline by more than the fraction `threshold`.
+  Results for a different corpus are not comparable, so raise ValueError.
+  """
+  
+  for key in ['seed', 'draw_count', 'rack_count']:
+    if results[key] != baseline_results[key]:
+      raise ValueError(
+        f'baseline has {key} {baseline_results[key]} '
+        f'rather than {results[key]}.'
+      )
+  
+  regression_list = []
+  
+  for workload_name, result in results['results'].items():
+    baseline_result = baseline_results['results'].get(workload_name)
+    if baseline_result is None:
+      continue
+    for key in ['seconds', 'peak_kib']:
+      value = result[key]
+      baseline_value = baseline_result[key]
+      if value is None or baseline_value is None:
+        continue
+      if value > baseline_value * (1 + threshold):
+        regression_list.append(
+          f'{workload_name}: {key} {value:.6g} '
+          f'exceeds baseline {baseline_value:.6g} '
+          f'by {value / baseline_value - 1:.1%}'
+        )
+  
+  return regression_list
+
+
+def check_is_non_negative_float(number_argument):
+  
+  try:
+    number = float(number_argument)
+  except ValueError:
+    number = None
+  
+  if number is None or not number >= 0:
+    raise argparse.ArgumentTypeError(
+      f'invalid non-negative number: {number_argument}'
+    )
+  
+  return number
+
+
+def parse_command_line_arguments():
+  
+  parser = \
+          argparse.ArgumentParser(
+            description='Benchmark the Countdown solvers.'
+          )
+  
+  parser.add_argument(
+    'workload_name_list',
+    metavar='WORKLOAD',
+    nargs='*',
+    help=f'workload to run (default all): {", ".join(WORKLOAD_NAMES)}',
+  )
+  
+  parser.add_argument(
+    '-s', dest='seed',
+    metavar='SEED',
+    type=int,
+    default=SEED_DEFAULT,
+    help=f'seed for generating the corpus (default {SEED_DEFAULT})',
+  )
+  
+  parser.add_argument(
+    '-d', dest='draw_count',
+    metavar='DRAWS',
+    type=int,
+    default=DRAW_COUNT_DEFAULT,
+    help=(
+      'number of random number draws, besides the fixed ones '
+      f'(default {DRAW_COUNT_DEFAULT})'
+    ),
+  )
+  
+  parser.add_argument(
+    '-r', dest='rack_count',
+    metavar='RACKS',
+    type=int,
+    default=RACK_COUNT_DEFAULT,
+    help=(
+      'number of random letter racks, besides the fixed ones '
+      f'(default {RACK_COUNT_DEFAULT})'
+    ),
+  )
+  
+  parser.add_argument(
+    '-n', dest='repeats_count',
+    metavar='REPEATS',
+    type=int,
+    default=REPEATS_DEFAULT,
+    help=(
+      'number of timed repeats of each workload, the best being kept '
+      f'(default {REPEATS_DEFAULT})'
+    ),
+  )
+  
+  parser.add_argument(
+    '-w', dest='word_list_file_name',
+    metavar='WORD_LIST',
+    type=str,
+    default=letters.WORD_LIST_FILE_NAME_DEFAULT,
+    help=(
+      'word list file name '
+      f'(default {letters.WORD_LIST_FILE_NAME_DEFAULT})'
+    ),
+  )
+  
+  parser.add_argument(
+    '-o', dest='results_file',
+    metavar='RESULTS',
+    type=argparse.FileType('w', encoding='UTF-8'),
+    default=None,
+    help='write the results to RESULTS (JSON)',
+  )
+  
+  parser.add_argument(
+    '-b', dest='baseline_file',
+    metavar='BASELINE',
+    type=argparse.FileType('r', encoding='UTF-8'),
+    default=None,
+    help='compare the results against those in BASELINE (JSON)',
+  )
+  
+  parser.add_argument(
+    '-t', dest='threshold',
+    metavar='THRESHOLD',
+    type=check_is_non_negative_float,
+    default=THRESHOLD_DEFAULT,
+    help=(
+      'fraction by which a time or peak memory may exceed the baseline '
+      f'before it counts as a regression (default {THRESHOLD_DEFAULT})'
+    ),
+  )
+  
+  parsed_arguments = parser.parse_args()
+  
+  for workload_name in parsed_arguments.workload_name_list:
+    if workload_name not in WORKLOAD_NAMES:
+      parser.error(f"invalid workload: '{workload_name}'")
+  
+  return parsed_arguments
+
+
+def print_results(results):
+  
+  print('workload\titems\tseconds\tthroughput\tpeak_kib\tsetup_seconds')
+  for workload_name, result in results['results'].items():
+    print(
+      f'{workload_name}\t{result["items"]}\t{result["seconds"]:.3f}\t'
+      f'{result["throughput"]:.1f}\t{result["peak_kib"]}\t'
+      f'{result["setup_seconds"]:.3f}'
+    )
+
+
+def main():
+  
+  parsed_arguments = parse_command_line_arguments()
+  
+  workload_name_list = parsed_arguments.workload_name_list or WORKLOAD_NAMES
+  seed = parsed_arguments.seed
+  draw_count = parsed_arguments.draw_count
+  rack_count = parsed_arguments.rack_count
+  repeats_count = parsed_arguments.repeats_count
+  word_list_file_name = parsed_arguments.word_list_file_name
+  results_file = parsed_arguments.results_file
+  baseline_file = parsed_arguments.baseline_file
+  threshold = parsed_arguments.threshold
+  
+  results = \
+          run_benchmark(
+            workload_name_list,
+            seed,
+            draw_count,
+            rack_count,
+            repeats_count,
+            word_list_file_name,
+          )
+  
+  print_results(results)
+  
+  if results_file is not None:
+    with results_file:
+      json.dump(results, results_file, indent=2)
+  
+  if baseline_file is not None:
+    with baseline_file:
+      baseline_results = json.load(baseline_file)
+    regression_list = compare_results(results, baseline_results, threshold)
+    for regression in regression_list:
+      print(f'REGRESSION {regression}', file=sys.stderr)
+    if regression_list:
+      sys.exit(1)
+
+
+if __name__ == '__main__':
+  
+  main()
@@ -0,0 +1,72 @@
+"""
+# cli.py
+
+Helpers shared by the command lines of the solvers and tools.
+
+Copyright 2022 Conway
+Licensed under the GNU General Public License v3.0 (GPL-3.0-only).
+This is free software with NO WARRANTY etc. etc., see LICENSE.
+"""
+
+
+import argparse
+import sys
+
+try:
+  import resource
+except ImportError:
+  resource = None
+
+
+def check_is_positive_integer(number_argument):
+  
+  try:
+    number = int(number_argument)
+  except ValueError:
+    raise argparse.ArgumentTypeError(f"not integer: '{number_argument}'")
+  
+  if not number > 0:
+    raise argparse.ArgumentTypeError(f"not positive: '{number_argument}'")
+  
+  return number
+
+
+def check_is_non_negative_integer(number_argument):
+  
+  try:
+    number = int(number_argument)
+  except ValueError:
+    raise argparse.ArgumentTypeError(f"not integer: '{number_argument}'")
+  
+  if not number >= 0:
+    raise argparse.ArgumentTypeError(f"negative: '{number_argument}'")
+  
+  return number
+
+
+def check_is_positive_float(number_argument):
+  
+  try:
+    number = float(number_argument)
+  except ValueError:
+    raise argparse.ArgumentTypeError(f"not a number: '{number_argument}'")
+  
+  if not number > 0:
+    raise argparse.ArgumentTypeError(f"not positive: '{number_argument}'")
+  
+  return number
+
+
+def get_peak_memory_kib():
+  """
+  Get the peak resident memory of this process in KiB, if available.
+  """
+  
+  if resource is None:
+    return None
+  
+  peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  if sys.platform == 'darwin':
+    peak_memory //= 1024 # reported in bytes rather than KiB
+  
+  return peak_memory
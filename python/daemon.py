@@ -0,0 +1,282 @@
+"""
+# daemon.py
+
+Serve Countdown solver queries from a long-running process.
+
+Copyright 2022 Conway
+Licensed under the GNU General Public License v3.0 (GPL-3.0-only).
+This is free software with NO WARRANTY etc. etc., see LICENSE.
+
+Each query is a JSON object on a line of its own,
+and is answered by a JSON object on a line of its own, in order.
+A query which cannot be answered is answered by {"error": MESSAGE},
+and the serving carries on.
+Queries are read either from a stream (e.g. stdin/stdout),
+or from the connections to a Unix socket, each connection being
+a stream of queries, with the connections served concurrently.
+This way, the cost of starting up and loading resources is paid once,
+rather than once per query.
+
+A batch of games can likewise be answered from a file in one process,
+where each line is either a JSON query or a game in a plain form,
+optionally spreading the games over several worker processes.
+"""
+
+
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import queue
+import socket
+import socketserver
+import stat
+import threading
+
+
+def answer_line(answer_query, line, parse_line=None):
+  """
+  Answer a line holding a JSON query, returning the JSON answer line.
+  
+  If `parse_line` is given, a line not starting with '{' is instead
+  a game in plain form, which `parse_line` turns into a query.
+  """
+  
+  try:
+    if parse_line is not None and not line.lstrip().startswith('{'):
+      query = parse_line(line)
+    else:
+      query = json.loads(line)
+    if not isinstance(query, dict):
+      raise ValueError('query must be a JSON object.')
+    answer = answer_query(query)
+  except KeyError as exception:
+    answer = {'error': f'missing key {exception}.'}
+  except (ValueError, TypeError) as exception:
+    answer = {'error': str(exception)}
+  except Exception as exception:
+    # e.g. sqlite3.OperationalError or MemoryError, which must not stop serving
+    answer = {'error': f'{type(exception).__name__}: {exception}'}
+  
+  return json.dumps(answer) + '\n'
+
+
+def serve_stream(answer_query, input_file, output_file):
+  """
+  Answer the queries of a stream until it ends.
+  """
+  
+  for line in input_file:
+    if not line.strip():
+      continue
+    output_file.write(answer_line(answer_query, line))
+    output_file.flush()
+
+
+def remove_stale_socket(socket_path):
+  """
+  Remove a socket file left over from an earlier server, if there is one.
+  
+  Only a socket refusing connections is removed; anything else
+  (a live server's socket, or a file which is not a socket)
+  is left alone, so that binding to it then fails.
+  """
+  
+  try:
+    mode = os.lstat(socket_path).st_mode
+  except FileNotFoundError:
+    return
+  
+  if not stat.S_ISSOCK(mode):
+    return
+  
+  with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client_socket:
+    try:
+      client_socket.connect(socket_path)
+    except ConnectionRefusedError:
+      os.remove(socket_path)
+
+
+def serve_socket(answer_query, socket_path):
+  """
+  Answer the queries of the connections to a Unix socket, until interrupted.
+  
+  A stale socket file left over from an earlier server is replaced,
+  see `remove_stale_socket`.
+  """
+  
+  class QueryStreamHandler(socketserver.StreamRequestHandler):
+    
+    def handle(self):
+      for line_bytes in self.rfile:
+        line = line_bytes.decode('utf-8')
+        if not line.strip():
+          continue
+        self.wfile.write(answer_line(answer_query, line).encode('utf-8'))
+        self.wfile.flush()
+  
+  remove_stale_socket(socket_path)
+  
+  with socketserver.ThreadingUnixStreamServer(
+    socket_path,
+    QueryStreamHandler,
+  ) as server:
+    server.daemon_threads = True
+    try:
+      server.serve_forever()
+    except KeyboardInterrupt:
+      pass
+    finally:
+      os.remove(socket_path)
+
+
+def send_queries(socket_path, query_list):
+  """
+  Send queries to a server on a Unix socket, returning the list of answers.
+  """
+  
+  with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client_socket:
+    client_socket.connect(socket_path)
+    with client_socket.makefile('rwb') as socket_file:
+      answer_list = []
+      for query in query_list:
+        socket_file.write((json.dumps(query) + '\n').encode('utf-8'))
+        socket_file.flush()
+        answer_list.append(json.loads(socket_file.readline()))
+      return answer_list
+
+
+BATCH_CHUNKS_PER_JOB = 2
+
+worker_answer_query = None
+worker_parse_line = None
+
+
+def initialise_batch_worker(load_answer_query, parse_line):
+  
+  global worker_answer_query
+  global worker_parse_line
+  
+  worker_answer_query = load_answer_query()
+  worker_parse_line = parse_line
+
+
+def answer_batch_lines(line_list):
+  
+  return [
+    answer_line(worker_answer_query, line, worker_parse_line)
+      for line in line_list
+  ]
+
+
+def serve_batch(
+  load_answer_query,
+  parse_line,
+  input_file,
+  output_file,
+  jobs_count=1,
+  chunk_size=1,
+):
+  """
+  Answer a batch of games, one per line, writing the answers in order.
+  
+  Each line is a JSON query or a game in plain form (see `answer_line`),
+  and blank lines are skipped.
+  The `answer_query` function is got by calling `load_answer_query`,
+  which must be picklable (e.g. a `functools.partial` of file names).
+  With `jobs_count` greater than 1, the games are spread over that many
+  worker processes, each of which calls `load_answer_query` once
+  (so that loaded resources, which may not be picklable,
+  are neither sent to the workers nor sent along with every game),
+  and each answer is written as soon as it and those before it are ready.
+  The games are sent to the workers up to `chunk_size` at a time,
+  which should be more than 1 if they are quick to answer
+  (a chunk taking only the games already read, rather than waiting),
+  and at most `BATCH_CHUNKS_PER_JOB` chunks per worker are outstanding,
+  so that games are read only as fast as they are answered
+  and answers stream out even while the input is still being written.
+  """
+  
+  line_iterable = (line for line in input_file if line.strip())
+  
+  if jobs_count <= 1:
+    answer_query = load_answer_query()
+    for line in line_iterable:
+      output_file.write(answer_line(answer_query, line, parse_line))
+      output_file.flush()
+    return
+  
+  # The games read so far, then None (or the exception ending the reading)
+  line_queue = queue.Queue(BATCH_CHUNKS_PER_JOB * jobs_count * chunk_size)
+  # The futures of the outstanding chunks, in order, then None
+  future_queue = queue.Queue(BATCH_CHUNKS_PER_JOB * jobs_count)
+  writer_exception_list = []
+  
+  def read_lines():
+    # Read here, since reading the next game may block for any length of time
+    try:
+      for line in line_iterable:
+        line_queue.put(line)
+      line_queue.put(None)
+    except Exception as exception:
+      line_queue.put(exception)
+  
+  def write_answers():
+    while (future := future_queue.get()) is not None:
+      if writer_exception_list:
+        continue # just drain the queue, so that submitting never blocks
+      try:
+        for answer_line_string in future.result():
+          output_file.write(answer_line_string)
+        output_file.flush()
+      except Exception as exception:
+        writer_exception_list.append(exception)
+  
+  def generate_chunks():
+    # A chunk takes the games already read, up to `chunk_size` of them
+    while True:
+      line_list = [line_queue.get()]
+      while len(line_list) < chunk_size and line_list[-1] is not None \
+      and not isinstance(line_list[-1], Exception):
+        try:
+          line_list.append(line_queue.get_nowait())
+        except queue.Empty:
+          break
+      last_item = line_list[-1]
+      if last_item is None or isinstance(last_item, Exception):
+        line_list.pop()
+      if line_list:
+        yield line_list
+      if isinstance(last_item, Exception):
+        raise last_item
+      if last_item is None:
+        return
+  
+  # Not fork, since a forked worker could inherit the lock of a reading thread
+  if 'forkserver' in multiprocessing.get_all_start_methods():
+    multiprocessing_context = multiprocessing.get_context('forkserver')
+  else:
+    multiprocessing_context = None
+  
+  with concurrent.futures.ProcessPoolExecutor(
+    jobs_count,
+    mp_context=multiprocessing_context,
+    initializer=initialise_batch_worker,
+    initargs=(load_answer_query, parse_line),
+  ) as executor:
+    # A daemon, since it may still be waiting on input if answering fails
+    threading.Thread(target=read_lines, daemon=True).start()
+    writer_thread = threading.Thread(target=write_answers)
+    writer_thread.start()
+    try:
+      for line_list in generate_chunks():
+        if writer_exception_list:
+          break
+        future_queue.put(executor.submit(answer_batch_lines, line_list))
+    finally:
+      future_queue.put(None)
+      writer_thread.join()
+  
+  if writer_exception_list:
+    raise writer_exception_list[0]
+
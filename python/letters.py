@@ -12,6 +12,56 @@ This is free software with NO WARRANTY etc. etc., see LICENSE.
 
 
 import argparse
+import array
+import bisect
+import cli
+import collections
+import daemon
+import functools
+import heapq
+import itertools
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+
+
+@functools.cache
+def import_numpy():
+  """
+  Import NumPy if available, else return None.
+  
+  This is only done (once) when a `LetterCountWordIndex` is used,
+  since importing NumPy costs more than a whole indexed query.
+  NumPy imports the standard library `numbers` module,
+  which our own `numbers.py` shadows when run from this directory,
+  so this directory (and our `numbers`, if already imported)
+  are set aside for the duration of the import.
+  """
+  
+  directory_name = os.path.dirname(os.path.abspath(__file__))
+  saved_path = list(sys.path)
+  saved_numbers_module = sys.modules.pop('numbers', None)
+  sys.path[:] = [
+    path
+      for path in sys.path
+      if os.path.abspath(path or os.curdir) != directory_name
+  ]
+  
+  try:
+    import numpy
+  except (ImportError, AttributeError):
+    numpy = None
+  finally:
+    sys.path[:] = saved_path
+    if saved_numbers_module is not None:
+      sys.modules['numbers'] = saved_numbers_module
+    else:
+      sys.modules.pop('numbers', None)
+  
+  return numpy
 
 
 def normalise_letters(string):
@@ -27,17 +77,666 @@ def is_valid(word, input_letters):
   )
 
 
-def compute_valid_word_list(word_list, input_letters):
+def compute_signature(letters):
+  
+  return ''.join(sorted(letters))
+
+
+def generate_sub_signatures(input_letters):
+  """
+  Generate the signatures of all sub-multisets of the input letters.
+  
+  For 9 distinct letters, there are 2^9 = 512 of these.
+  """
+  
+  letter_count_pair_list = sorted(collections.Counter(input_letters).items())
+  
+  for count_tuple in itertools.product(
+    *(range(count + 1) for _, count in letter_count_pair_list)
+  ):
+    yield ''.join(
+      letter * count
+        for (letter, _), count in zip(letter_count_pair_list, count_tuple)
+    )
+
+
+def count_sub_signatures(input_letters):
+  
+  return math.prod(
+    count + 1
+      for count in collections.Counter(input_letters).values()
+  )
+
+
+def find_word_indices_by_signature(signature_word_index, input_letters):
+  """
+  Find valid words by looking up every sub-multiset of the input letters.
+  
+  Here `signature_word_index` maps signatures to lists of word positions,
+  so that the cost no longer depends on the size of the word list.
+  
+  The number of sub-multisets grows exponentially with the input letters
+  (2^18 for 18 distinct letters), so beyond `len(signature_word_index)`
+  divided by `SIGNATURE_LOOKUP_COST` of them, the signatures of the index
+  are scanned instead, which bounds the cost by the size of the index.
+  """
+  
+  if count_sub_signatures(input_letters) \
+  > len(signature_word_index) / SIGNATURE_LOOKUP_COST:
+    return sorted(
+      word_index
+        for signature, word_index_list in signature_word_index.items()
+        if is_valid(signature, input_letters)
+        for word_index in word_index_list
+    )
+  
+  return sorted(
+    word_index
+      for signature in generate_sub_signatures(input_letters)
+      for word_index in signature_word_index.get(signature, ())
+  )
+
+
+class SignatureWordIndex:
+  """
+  An index of the word list by sorted-letter signature.
+  
+  Each signature maps to the positions of its words in the word list,
+  so that results can be given in word list order.
+  """
+  
+  def __init__(self, word_list):
+    
+    self.word_index_list_from_signature = {}
+    
+    for word_index, word in enumerate(word_list):
+      signature = compute_signature(word)
+      self.word_index_list_from_signature \
+              .setdefault(signature, []).append(word_index)
+  
+  def __len__(self):
+    return len(self.word_index_list_from_signature)
+  
+  def get(self, signature, default=None):
+    return self.word_index_list_from_signature.get(signature, default)
+  
+  def items(self):
+    return self.word_index_list_from_signature.items()
+  
+  def find_word_indices(self, input_letters):
+    return find_word_indices_by_signature(self, input_letters)
+
+
+class LetterCountWordIndex:
+  """
+  An index of the word list by letter-count vector.
+  
+  With NumPy, the word list is stored as an (N, A) uint8 matrix,
+  where A is the number of distinct letters in the word list,
+  so that every word is checked against the input letters
+  in a single broadcasted comparison.
+  Without NumPy, the same check is done word by word in pure Python,
+  which is still cheaper than `is_valid` since the counts are precomputed.
+  """
+  
+  def __init__(self, word_list):
+    
+    letter_count_list_list = [
+      collections.Counter(word).most_common()
+        for word in word_list
+    ]
+    self.alphabet = sorted({
+      letter
+        for letter_count_list in letter_count_list_list
+        for letter, _ in letter_count_list
+    })
+    
+    numpy = import_numpy()
+    if numpy is None:
+      self.letter_count_list_list = letter_count_list_list
+      return
+    
+    column_from_letter = {
+      letter: column
+        for column, letter in enumerate(self.alphabet)
+    }
+    row_list = []
+    column_list = []
+    count_list = []
+    for row, letter_count_list in enumerate(letter_count_list_list):
+      for letter, count in letter_count_list:
+        row_list.append(row)
+        column_list.append(column_from_letter[letter])
+        count_list.append(count)
+    
+    self.letter_count_matrix = \
+            numpy.zeros((len(word_list), len(self.alphabet)), numpy.uint8)
+    self.letter_count_matrix[row_list, column_list] = \
+            numpy.minimum(count_list, 255)
+  
+  def find_word_indices(self, input_letters):
+    
+    input_letter_count_from_letter = collections.Counter(input_letters)
+    
+    numpy = import_numpy()
+    if numpy is None:
+      return [
+        word_index
+          for word_index, letter_count_list
+            in enumerate(self.letter_count_list_list)
+          if all(
+            count <= input_letter_count_from_letter[letter]
+              for letter, count in letter_count_list
+          )
+      ]
+    
+    input_letter_count_vector = \
+            numpy.array(
+              [
+                min(input_letter_count_from_letter[letter], 255)
+                  for letter in self.alphabet
+              ],
+              numpy.uint8,
+            )
+    is_valid_vector = \
+            numpy.all(
+              self.letter_count_matrix <= input_letter_count_vector,
+              axis=1,
+            )
+    return numpy.flatnonzero(is_valid_vector).tolist()
+
+
+class DawgWordIndex:
+  """
+  An index of the word list as a directed acyclic word graph (DAWG).
+  
+  This is a trie of the distinct words in which identical subtrees
+  are shared, so that it takes far less memory than the word list itself.
+  Each node is a tuple
+  
+          (is_terminal, word_count, ((letter, offset, child), ...))
+  
+  where `word_count` is the number of words below (and at) the node,
+  and `offset` is the (alphabetical) rank of the child's first word
+  relative to the node's first word.
+  Ranks are mapped back to word list positions by `word_index_array`,
+  with the positions of the rank-r word being found at positions
+  [start_r, start_{r+1}) of it, where start_r is `rank_start_array[r]`.
+  
+  Valid words are found by a depth-first search which spends the
+  input letters along the way, so that every subtree whose prefix
+  cannot be formed from the input letters is pruned.
+  
+  The word list itself is not kept, since the graph holds every word:
+  `find_words` spells the valid words out from the search path,
+  and `word_list` (a `DawgWordList`) spells out any word by its rank,
+  found in `rank_from_word_index_array`.
+  """
+  
+  def __init__(self, word_list):
+    
+    # Stable, so that the positions of each word stay ascending
+    self.word_index_array = \
+            array.array(
+              'I',
+              sorted(range(len(word_list)), key=word_list.__getitem__),
+            )
+    self.rank_start_array = array.array('I')
+    self.rank_from_word_index_array = array.array('I', [0]) * len(word_list)
+    previous_word = None
+    for position, word_index in enumerate(self.word_index_array):
+      word = word_list[word_index]
+      if word != previous_word:
+        self.rank_start_array.append(position)
+        previous_word = word
+      self.rank_from_word_index_array[word_index] = \
+              len(self.rank_start_array) - 1
+    self.rank_start_array.append(len(self.word_index_array))
+    
+    self.root = \
+            DawgWordIndex.build_root(
+              word_list[self.word_index_array[start]]
+                for start in self.rank_start_array[:-1]
+            )
+    self.word_list = DawgWordList(self)
+  
+  @staticmethod
+  def build_root(distinct_word_iterable):
+    """
+    Build the graph from sorted distinct words.
+    
+    Nodes along the path of the latest word are kept mutable,
+    as [is_terminal, [(letter, child), ...]], and are frozen
+    (deduplicated against a registry of frozen nodes) as soon as
+    a later word diverges from them, since sorted input guarantees
+    that they cannot gain further children.
+    """
+    
+    frozen_node_from_key = {}
+    
+    def freeze(mutable_node):
+      is_terminal, letter_child_pair_list = mutable_node
+      key = (
+        is_terminal,
+        *(
+          item
+            for letter, child in letter_child_pair_list
+            for item in (letter, id(child))
+        ),
+      )
+      if key not in frozen_node_from_key:
+        child_entry_list = []
+        offset = int(is_terminal)
+        for letter, child in letter_child_pair_list:
+          child_entry_list.append((letter, offset, child))
+          offset += child[1]
+        frozen_node_from_key[key] = \
+                (is_terminal, offset, tuple(child_entry_list))
+      return frozen_node_from_key[key]
+    
+    path = [(None, [False, []])]
+    previous_word = ''
+    
+    def freeze_path_beyond(length):
+      while len(path) > length + 1:
+        letter, mutable_node = path.pop()
+        path[-1][1][1].append((letter, freeze(mutable_node)))
+    
+    for word in distinct_word_iterable:
+      prefix_length = 0
+      for letter, previous_letter in zip(word, previous_word):
+        if letter != previous_letter:
+          break
+        prefix_length += 1
+      freeze_path_beyond(prefix_length)
+      for letter in word[prefix_length:]:
+        path.append((letter, [False, []]))
+      path[-1][1][0] = True
+      previous_word = word
+    
+    freeze_path_beyond(0)
+    
+    return freeze(path[0][1])
+  
+  def find_word_indices(self, input_letters):
+    
+    input_letter_count_from_letter = collections.Counter(input_letters)
+    rank_list = []
+    
+    def search(node, rank):
+      is_terminal, _, child_entry_tuple = node
+      if is_terminal:
+        rank_list.append(rank)
+      for letter, offset, child in child_entry_tuple:
+        if input_letter_count_from_letter[letter] > 0:
+          input_letter_count_from_letter[letter] -= 1
+          search(child, rank + offset)
+          input_letter_count_from_letter[letter] += 1
+    
+    search(self.root, 0)
+    
+    return sorted(
+      word_index
+        for rank in rank_list
+        for word_index in self.word_index_array[
+          self.rank_start_array[rank]:self.rank_start_array[rank + 1]
+        ]
+    )
+  
+  def find_words(self, input_letters):
+    """
+    Find the words that can be formed from the input letters.
+    
+    The words are spelt out from the path of the search,
+    and are returned in word list order.
+    """
+    
+    input_letter_count_from_letter = collections.Counter(input_letters)
+    path_letter_list = []
+    rank_word_pair_list = []
+    
+    def search(node, rank):
+      is_terminal, _, child_entry_tuple = node
+      if is_terminal:
+        rank_word_pair_list.append((rank, ''.join(path_letter_list)))
+      for letter, offset, child in child_entry_tuple:
+        if input_letter_count_from_letter[letter] > 0:
+          input_letter_count_from_letter[letter] -= 1
+          path_letter_list.append(letter)
+          search(child, rank + offset)
+          path_letter_list.pop()
+          input_letter_count_from_letter[letter] += 1
+    
+    search(self.root, 0)
+    
+    word_index_word_pair_list = [
+      (word_index, word)
+        for rank, word in rank_word_pair_list
+        for word_index in self.word_index_array[
+          self.rank_start_array[rank]:self.rank_start_array[rank + 1]
+        ]
+    ]
+    word_index_word_pair_list.sort()
+    
+    return [word for _, word in word_index_word_pair_list]
+
+
+class DawgWordList:
+  """
+  The word list of a `DawgWordIndex`, spelt out from its graph.
+  
+  A word is found by descending from the root towards its rank,
+  into the last child whose first word is at or before it.
+  """
+  
+  def __init__(self, dawg_word_index):
+    self.dawg_word_index = dawg_word_index
+  
+  def __len__(self):
+    return len(self.dawg_word_index.rank_from_word_index_array)
+  
+  def __getitem__(self, word_index):
+    
+    rank = self.dawg_word_index.rank_from_word_index_array[word_index]
+    node = self.dawg_word_index.root
+    letter_list = []
+    
+    while True:
+      is_terminal, _, child_entry_tuple = node
+      if is_terminal and rank == 0:
+        return ''.join(letter_list)
+      for letter, offset, child in reversed(child_entry_tuple):
+        if offset <= rank:
+          break
+      letter_list.append(letter)
+      rank -= offset
+      node = child
+
+
+def compute_valid_word_list(word_list, input_letters, word_index=None):
+  """
+  Compute the words that can be formed from the input letters.
+  
+  If `word_index` (e.g. a `SignatureWordIndex`, `LetterCountWordIndex`
+  or `DawgWordIndex` built from the word list) is given,
+  the valid words are found by its `find_word_indices` method,
+  which returns their positions in ascending order
+  (or for a `DawgWordIndex`, by its `find_words` method).
+  Otherwise the whole word list is scanned.
+  Either way, the words are in word list order.
+  """
+  
+  if word_index is None:
+    return [
+      word
+        for word in word_list
+        if is_valid(word, input_letters)
+    ]
+  
+  if isinstance(word_index, DawgWordIndex):
+    return word_index.find_words(input_letters)
   
   return [
-    word
-      for word in word_list
-      if is_valid(word, input_letters)
+    word_list[word_index]
+      for word_index in word_index.find_word_indices(input_letters)
   ]
 
 
+def read_word_list(word_list_file_name):
+  
+  with open(word_list_file_name, 'r', encoding='UTF-8') as word_list_file:
+    return [
+      normalise_letters(word)
+        for word in word_list_file.read().splitlines()
+    ]
+
+
+class MappedWordList:
+  """
+  A word list stored as a blob of UTF-8 bytes plus an offset array.
+  """
+  
+  def __init__(self, word_blob, word_offset_array):
+    self.word_blob = word_blob
+    self.word_offset_array = word_offset_array
+  
+  def __len__(self):
+    return len(self.word_offset_array) - 1
+  
+  def __getitem__(self, word_index):
+    start = self.word_offset_array[word_index]
+    end = self.word_offset_array[word_index + 1]
+    return str(self.word_blob[start:end], 'UTF-8')
+
+
+class MappedWordIndex:
+  """
+  A word index memory-mapped from an index file.
+  
+  Written by `write_word_index_file`, and laid out thus:
+  
+          header
+          word offset array               (word count + 1)
+          signature offset array          (signature count + 1)
+          signature word start array      (signature count + 1)
+          word index array                (word count)
+          word blob
+          signature blob
+  
+  where the arrays are of unsigned 32-bit integers in native byte order
+  (the index is only a local cache of the word list).
+  The signatures are sorted by their UTF-8 bytes,
+  and the word indices of the k-th signature are found at
+  positions [start_k, start_{k+1}) of the word index array.
+  
+  The `get` and `items` methods behave like those of `SignatureWordIndex`,
+  and `word_list` behaves like the word list it was built from,
+  so that both can be passed to `compute_valid_word_list`.
+  """
+  
+  MAGIC = b'CDWI'
+  VERSION = 1
+  HEADER_FORMAT = '=4sIQQIIII'
+  HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+  
+  def __init__(self, index_file):
+    
+    self.mapping = \
+            mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    if len(self.mapping) < MappedWordIndex.HEADER_SIZE:
+      raise ValueError('truncated index file')
+    
+    (
+      magic,
+      version,
+      self.word_list_file_size,
+      self.word_list_file_mtime_ns,
+      word_count,
+      signature_count,
+      word_blob_size,
+      signature_blob_size,
+    ) = struct.unpack_from(MappedWordIndex.HEADER_FORMAT, self.mapping)
+    
+    if magic != MappedWordIndex.MAGIC or version != MappedWordIndex.VERSION:
+      raise ValueError(f'not a version {MappedWordIndex.VERSION} index file')
+    
+    view = memoryview(self.mapping)
+    position = MappedWordIndex.HEADER_SIZE
+    
+    def take(size):
+      nonlocal position
+      start = position
+      position += size
+      if position > len(self.mapping):
+        raise ValueError('truncated index file')
+      return view[start:position]
+    
+    integer_size = array.array('I').itemsize
+    word_offset_array = take((word_count + 1) * integer_size).cast('I')
+    self.signature_offset_array = \
+            take((signature_count + 1) * integer_size).cast('I')
+    self.signature_word_start_array = \
+            take((signature_count + 1) * integer_size).cast('I')
+    self.word_index_array = take(word_count * integer_size).cast('I')
+    word_blob = take(word_blob_size)
+    self.signature_blob = take(signature_blob_size)
+    
+    self.word_list = MappedWordList(word_blob, word_offset_array)
+    self.signature_count = signature_count
+  
+  def __len__(self):
+    return self.signature_count
+  
+  def get_signature_bytes(self, signature_index):
+    start = self.signature_offset_array[signature_index]
+    end = self.signature_offset_array[signature_index + 1]
+    return self.signature_blob[start:end].tobytes()
+  
+  def get(self, signature, default=None):
+    
+    signature_bytes = signature.encode('UTF-8')
+    signature_index = \
+            bisect.bisect_left(
+              range(self.signature_count),
+              signature_bytes,
+              key=self.get_signature_bytes,
+            )
+    
+    if signature_index == self.signature_count \
+    or self.get_signature_bytes(signature_index) != signature_bytes:
+      return default
+    
+    return self.get_word_indices(signature_index)
+  
+  def get_word_indices(self, signature_index):
+    start = self.signature_word_start_array[signature_index]
+    end = self.signature_word_start_array[signature_index + 1]
+    return self.word_index_array[start:end]
+  
+  def items(self):
+    for signature_index in range(self.signature_count):
+      yield (
+        str(self.get_signature_bytes(signature_index), 'UTF-8'),
+        self.get_word_indices(signature_index),
+      )
+  
+  def find_word_indices(self, input_letters):
+    return find_word_indices_by_signature(self, input_letters)
+  
+  def is_fresh_for(self, word_list_file_name):
+    
+    word_list_stat = os.stat(word_list_file_name)
+    return (
+      self.word_list_file_size == word_list_stat.st_size
+        and
+      self.word_list_file_mtime_ns == word_list_stat.st_mtime_ns
+    )
+
+
+def write_word_index_file(word_list_file_name, index_file_name):
+  """
+  Write the index file for a word list, see `MappedWordIndex`.
+  
+  The file is written under a temporary name and then moved into place,
+  so that concurrent readers never see a partial index.
+  """
+  
+  word_list_stat = os.stat(word_list_file_name)
+  word_list = read_word_list(word_list_file_name)
+  word_index_list_from_signature = \
+          SignatureWordIndex(word_list).word_index_list_from_signature
+  
+  word_offset_array = array.array('I', [0])
+  word_bytes_list = []
+  for word in word_list:
+    word_bytes = word.encode('UTF-8')
+    word_bytes_list.append(word_bytes)
+    word_offset_array.append(word_offset_array[-1] + len(word_bytes))
+  
+  signature_bytes_list = []
+  signature_offset_array = array.array('I', [0])
+  signature_word_start_array = array.array('I', [0])
+  word_index_array = array.array('I')
+  for signature_bytes, word_index_list in sorted(
+    (signature.encode('UTF-8'), word_index_list)
+      for signature, word_index_list in word_index_list_from_signature.items()
+  ):
+    signature_bytes_list.append(signature_bytes)
+    signature_offset_array.append(
+      signature_offset_array[-1] + len(signature_bytes)
+    )
+    word_index_array.extend(word_index_list)
+    signature_word_start_array.append(len(word_index_array))
+  
+  word_blob = b''.join(word_bytes_list)
+  signature_blob = b''.join(signature_bytes_list)
+  
+  header = \
+          struct.pack(
+            MappedWordIndex.HEADER_FORMAT,
+            MappedWordIndex.MAGIC,
+            MappedWordIndex.VERSION,
+            word_list_stat.st_size,
+            word_list_stat.st_mtime_ns,
+            len(word_list),
+            len(signature_bytes_list),
+            len(word_blob),
+            len(signature_blob),
+          )
+  
+  temporary_file_name = f'{index_file_name}.{os.getpid()}.tmp'
+  with open(temporary_file_name, 'wb') as index_file:
+    index_file.write(header)
+    index_file.write(word_offset_array.tobytes())
+    index_file.write(signature_offset_array.tobytes())
+    index_file.write(signature_word_start_array.tobytes())
+    index_file.write(word_index_array.tobytes())
+    index_file.write(word_blob)
+    index_file.write(signature_blob)
+  os.replace(temporary_file_name, index_file_name)
+
+
+def open_word_index(word_list_file_name, index_file_name):
+  """
+  Open the index file for a word list, if there is one.
+  
+  An index which is out of date with respect to the word list
+  (by size or modification time), or which cannot be read
+  (being empty, truncated or of another version), is rebuilt first.
+  Returns None if there is no index file.
+  """
+  
+  if not os.path.isfile(index_file_name):
+    return None
+  
+  try:
+    with open(index_file_name, 'rb') as index_file:
+      word_index = MappedWordIndex(index_file)
+  except ValueError:
+    word_index = None
+  
+  if word_index is None or not word_index.is_fresh_for(word_list_file_name):
+    write_word_index_file(word_list_file_name, index_file_name)
+    with open(index_file_name, 'rb') as index_file:
+      word_index = MappedWordIndex(index_file)
+  
+  return word_index
+
+
 MAX_RESULTS_DEFAULT = 30
 WORD_LIST_FILE_NAME_DEFAULT = '../yawl.txt'
+INDEX_FILE_NAME_SUFFIX = '.index'
+BATCH_CHUNK_SIZE = 64
+SIGNATURE_LOOKUP_COST = 8 # signatures scanned in the time of a lookup
+
+WORD_INDEX_CLASS_FROM_ENGINE = {
+  'signature': SignatureWordIndex,
+  'counts': LetterCountWordIndex,
+  'dawg': DawgWordIndex,
+}
+ENGINE_SCAN = 'scan'
+ENGINES = [ENGINE_SCAN, *WORD_INDEX_CLASS_FROM_ENGINE]
 
 
 def parse_command_line_arguments():
@@ -51,6 +750,7 @@ def parse_command_line_arguments():
     'input_letters',
     metavar='LETTERS',
     type=str,
+    nargs='?',
     help='string containing the letters that can be used to form words',
   )
   
@@ -63,14 +763,99 @@ def parse_command_line_arguments():
   )
   
   parser.add_argument(
-    '-w', dest="word_list_file",
+    '-w', dest="word_list_file_name",
     metavar='WORD_LIST',
-    type=argparse.FileType('r', encoding='UTF-8'),
+    type=str,
     default=WORD_LIST_FILE_NAME_DEFAULT,
     help=f'word list file name (default {WORD_LIST_FILE_NAME_DEFAULT})',
   )
   
-  return parser.parse_args()
+  parser.add_argument(
+    '-e', dest="engine",
+    choices=ENGINES,
+    default=None,
+    help=(
+      'engine for finding words in the word list read in full '
+      '(default: use the index file if there is one, otherwise scan)'
+    ),
+  )
+  
+  parser.add_argument(
+    '--build-index', dest="build_index",
+    action='store_true',
+    help=(
+      f'build the index file WORD_LIST{INDEX_FILE_NAME_SUFFIX}, '
+      'which is then used (and kept up to date) by queries'
+    ),
+  )
+  
+  parser.add_argument(
+    '--stats', dest="show_statistics",
+    action='store_true',
+    help='print the load and filter times and peak memory to stderr',
+  )
+  
+  parser.add_argument(
+    '--serve', dest="serve",
+    action='store_true',
+    help=(
+      'rather than solving one game, load the word list once '
+      'and answer JSON-lines queries from stdin (or SOCKET)'
+    ),
+  )
+  
+  parser.add_argument(
+    '--socket', dest="socket_path",
+    metavar='SOCKET',
+    default=None,
+    help=(
+      'with --serve, listen on the Unix socket SOCKET; '
+      'otherwise have the game solved by the server listening on SOCKET'
+    ),
+  )
+  
+  parser.add_argument(
+    '--batch', dest="batch_file",
+    metavar='FILE',
+    type=argparse.FileType('r', encoding='UTF-8'),
+    default=None,
+    help=(
+      "rather than solving one game, solve the games in FILE ('-' for stdin), "
+      'one per line as LETTERS or a JSON query as for --serve, '
+      'printing a JSON answer line for each in order'
+    ),
+  )
+  
+  parser.add_argument(
+    '-j', dest="jobs_count",
+    metavar='JOBS',
+    type=int,
+    default=1,
+    help='number of worker processes for --batch (default 1)',
+  )
+  
+  parsed_arguments = parser.parse_args()
+  
+  if parsed_arguments.serve or parsed_arguments.batch_file is not None:
+    if parsed_arguments.input_letters is not None:
+      parser.error('arguments --serve, --batch: not allowed with LETTERS')
+  elif parsed_arguments.input_letters is None \
+  and not parsed_arguments.build_index:
+    parser.error('the following arguments are required: LETTERS')
+  
+  # A client of a server (--socket alone) never reads the word list
+  is_client = \
+          parsed_arguments.socket_path is not None \
+          and not parsed_arguments.serve \
+          and parsed_arguments.batch_file is None \
+          and not parsed_arguments.build_index
+  if not is_client \
+  and not os.path.isfile(parsed_arguments.word_list_file_name):
+    parser.error(
+      f"no such word list file: '{parsed_arguments.word_list_file_name}'"
+    )
+  
+  return parsed_arguments
 
 
 def print_results(valid_word_list, max_results_count):
@@ -80,27 +865,203 @@ def print_results(valid_word_list, max_results_count):
     print(f'{score}\t{word}')
 
 
+def load_word_list_and_index(word_list_file_name, index_file_name, engine):
+  """
+  Load the word list and word index (None for a scan) for an engine.
+  
+  For engine None, the index file is used if there is one,
+  otherwise the word list is read in full and scanned.
+  """
+  
+  if engine is None:
+    word_index = open_word_index(word_list_file_name, index_file_name)
+  else:
+    word_index = None
+  
+  if word_index is None:
+    word_list = read_word_list(word_list_file_name)
+    if engine in WORD_INDEX_CLASS_FROM_ENGINE:
+      word_index = WORD_INDEX_CLASS_FROM_ENGINE[engine](word_list)
+  
+  if isinstance(word_index, (MappedWordIndex, DawgWordIndex)):
+    word_list = word_index.word_list # rather than keep the list read in
+  
+  return word_list, word_index
+
+
+def load_answer_query(
+  word_list_file_name,
+  index_file_name,
+  engine,
+  max_results_count,
+):
+  """
+  Load the word list and word index, and return `answer_query` bound to them.
+  
+  This is passed (by file names) to each worker of a batch,
+  which thus maps the index file itself rather than being sent it.
+  """
+  
+  word_list, word_index = \
+          load_word_list_and_index(word_list_file_name, index_file_name, engine)
+  
+  return functools.partial(
+    answer_query,
+    word_list=word_list,
+    word_index=word_index,
+    max_results_count=max_results_count,
+  )
+
+
+def answer_query(query, word_list, word_index, max_results_count):
+  """
+  Answer a JSON query for `daemon`, solving the game it describes.
+  
+  The query has the key "letters", and may override
+  the server's maximum number of results with the key "max_results".
+  The answer has the key "results", a list of [score, word].
+  """
+  
+  input_letters = query['letters']
+  max_results_count = query.get('max_results', max_results_count)
+  
+  if not isinstance(input_letters, str):
+    raise ValueError('letters must be a string.')
+  if type(max_results_count) is not int:
+    raise ValueError('max_results must be an integer.')
+  
+  valid_word_list = \
+          heapq.nlargest(
+            max_results_count,
+            compute_valid_word_list(
+              word_list,
+              normalise_letters(input_letters),
+              word_index,
+            ),
+            key=len,
+          )
+  
+  return {
+    'results': [
+      [len(word), word]
+        for word in valid_word_list
+    ],
+  }
+
+
+def parse_game_line(line):
+  """
+  Parse a game line of the form LETTERS into a query.
+  """
+  
+  return {'letters': line.strip()}
+
+
+def print_statistics(value_from_field_name):
+  
+  for field_name, value in value_from_field_name.items():
+    if isinstance(value, float):
+      value = f'{value:.3f}'
+    print(f'{field_name}\t{value}', file=sys.stderr)
+
+
 def main():
   
   parsed_arguments = parse_command_line_arguments()
   
   input_letters = parsed_arguments.input_letters
   max_results_count = parsed_arguments.max_results_count
-  word_list_file = parsed_arguments.word_list_file
+  word_list_file_name = parsed_arguments.word_list_file_name
+  build_index = parsed_arguments.build_index
+  engine = parsed_arguments.engine
+  show_statistics = parsed_arguments.show_statistics
+  serve = parsed_arguments.serve
+  socket_path = parsed_arguments.socket_path
+  batch_file = parsed_arguments.batch_file
+  jobs_count = parsed_arguments.jobs_count
+  
+  index_file_name = f'{word_list_file_name}{INDEX_FILE_NAME_SUFFIX}'
+  
+  if build_index:
+    write_word_index_file(word_list_file_name, index_file_name)
+    if input_letters is None and not serve and batch_file is None:
+      return
+  
+  load_answer_query_from_files = \
+          functools.partial(
+            load_answer_query,
+            word_list_file_name,
+            index_file_name,
+            engine,
+            max_results_count,
+          )
+  
+  if batch_file is not None:
+    with batch_file:
+      daemon.serve_batch(
+        load_answer_query_from_files,
+        parse_game_line,
+        batch_file,
+        sys.stdout,
+        jobs_count,
+        BATCH_CHUNK_SIZE,
+      )
+    return
+  
+  if serve:
+    answer_query_with_word_list = load_answer_query_from_files()
+    if socket_path is None:
+      daemon.serve_stream(answer_query_with_word_list, sys.stdin, sys.stdout)
+    else:
+      daemon.serve_socket(answer_query_with_word_list, socket_path)
+    return
+  
+  if socket_path is not None:
+    query = {'letters': input_letters, 'max_results': max_results_count}
+    [answer] = daemon.send_queries(socket_path, [query])
+    if 'error' in answer:
+      sys.exit(f'error: {answer["error"]}')
+    for score, word in answer['results']:
+      print(f'{score}\t{word}')
+    return
   
   input_letters = normalise_letters(input_letters)
-  word_list = [
-    normalise_letters(word)
-      for word in word_list_file.read().splitlines()
-  ]
   
+  start_time = time.perf_counter()
+  
+  word_list, word_index = \
+          load_word_list_and_index(word_list_file_name, index_file_name, engine)
+  
+  load_time = time.perf_counter()
+  
+  valid_word_list_unsorted = \
+          compute_valid_word_list(word_list, input_letters, word_index)
   valid_word_list = \
-          sorted(
-            compute_valid_word_list(word_list, input_letters),
-            key=len, reverse=True,
+          heapq.nlargest(
+            max_results_count,
+            valid_word_list_unsorted,
+            key=len,
           )
   
+  filter_time = time.perf_counter()
+  
   print_results(valid_word_list, max_results_count)
+  
+  if show_statistics:
+    if word_index is None:
+      engine_name = 'scan'
+    else:
+      engine_name = type(word_index).__name__
+    print_statistics(
+      {
+        'engine': engine_name,
+        'words': len(word_list),
+        'valid_words': len(valid_word_list_unsorted),
+        'load_seconds': load_time - start_time,
+        'filter_seconds': filter_time - load_time,
+        'peak_kib': cli.get_peak_memory_kib(),
+      }
+    )
 
 
 if __name__ == '__main__':
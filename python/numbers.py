@@ -12,13 +12,44 @@ This is free software with NO WARRANTY etc. etc., see LICENSE.
 
 
 import argparse
+import bisect
+import cli
+import concurrent.futures
+import contextlib
+import daemon
+import functools
+import heapq
+import math
+import multiprocessing
 import operator
+import re
+import sqlite3
+import sys
+import time
+import zlib
+
+
+def divide(dividend, divisor):
+  """
+  Divide, keeping exact integer quotients as int.
+  
+  The solver only ever divides when the remainder is zero
+  (see `might_be_useful`), so its values never become floats.
+  An inexact quotient falls back to true division.
+  """
+  
+  quotient, remainder = divmod(dividend, divisor)
+  
+  if remainder == 0:
+    return quotient
+  
+  return dividend / divisor
 
 
 ADD = operator.add
 SUBTRACT = operator.sub
 MULTIPLY = operator.mul
-DIVIDE = operator.truediv
+DIVIDE = divide
 
 OPERATORS_ADDITIVE = [ADD, SUBTRACT]
 OPERATORS_MULTIPLICATIVE = [MULTIPLY, DIVIDE]
@@ -52,8 +83,27 @@ class Expression:
   The imposed canonical order ensures preference for
   positive integer results as required by the rules
   of the Countdown numbers game.
+  
+  Since millions of expressions are created per solve,
+  attributes are held in slots rather than a per-instance dict,
+  and the constants are an immutable tuple.
+  The depth, rank and string are only needed for the few expressions
+  that get ordered or printed, so they are computed on first access.
   """
   
+  __slots__ = (
+    'type',
+    'constants',
+    'parts',
+    'signs',
+    'value',
+    'mass',
+    'hash',
+    'depth_cached',
+    'rank_cached',
+    'string_cached',
+  )
+  
   TYPE_CONSTANT = 0
   TYPE_ADDITIVE = 1
   TYPE_MULTIPLICATIVE = 2
@@ -77,80 +127,136 @@ class Expression:
     
     if binary_operator is None:
       
-      self.type = Expression.TYPE_CONSTANT
-      
       integer = child_1
-      self.constants = [integer]
-      self.parts = ()
-      self.signs = ()
-      self.value = integer
+      self.initialise(Expression.TYPE_CONSTANT, (integer,), (), (), integer)
       
     else:
       
-      if binary_operator in OPERATORS_ADDITIVE:
-        self.type = Expression.TYPE_ADDITIVE
-      elif binary_operator in OPERATORS_MULTIPLICATIVE:
-        self.type = Expression.TYPE_MULTIPLICATIVE
-      else:
-        raise ValueError(
-          f'binary operator must be one of {OPERATORS}.'
-        )
-      
-      self.constants = [
-        *child_1.constants,
-        *child_2.constants,
-      ]
-      
-      parts = (
-        *self.get_parts_for(child_1),
-        *self.get_parts_for(child_2),
+      expression_type, parts, signs = \
+              Expression.canonicalise(child_1, child_2, binary_operator)
+      self.initialise(
+        expression_type,
+        child_1.constants + child_2.constants,
+        parts,
+        signs,
+        binary_operator(child_1.value, child_2.value),
       )
-      signs = (
-        *self.get_signs_for(child_1, binary_operator, is_first_child=True),
-        *self.get_signs_for(child_2, binary_operator, is_first_child=False),
-      )
-      sorted_parts_and_signs = \
-              sorted(
-                zip(parts, signs),
-                key=self.parts_and_signs_sort_key,
-              )
-      parts, signs = zip(*sorted_parts_and_signs)
-      
-      self.parts = parts
-      self.signs = signs
-      self.value = binary_operator(child_1.value, child_2.value)
+  
+  def initialise(self, expression_type, constants, parts, signs, value):
+    
+    self.type = expression_type
+    self.constants = constants
+    self.parts = parts
+    self.signs = signs
+    self.value = value
     
     self.mass = len(self.constants)
-    self.depth = max([part.depth + 1 for part in self.parts], default=0)
     self.hash = hash((self.value, self.type, self.parts, self.signs))
     
-    self.rank = (
-      self.mass,
-      self.depth,
-      len(self.parts),
-      tuple(part.rank for part in self.parts),
-      -self.value,
-      self.type,
-    )
+    self.depth_cached = None
+    self.rank_cached = None
+    self.string_cached = None
   
-  def get_parts_for(self, child):
+  @staticmethod
+  def canonicalise(child_1, child_2, binary_operator):
+    """
+    Compute the canonical (type, parts, signs) of a binary combination.
+    """
     
-    if self.type == child.type:
-      return child.parts # so as to flatten it out
+    if binary_operator in OPERATORS_ADDITIVE:
+      expression_type = Expression.TYPE_ADDITIVE
+    elif binary_operator in OPERATORS_MULTIPLICATIVE:
+      expression_type = Expression.TYPE_MULTIPLICATIVE
     else:
-      return (child,) # keep it as is
-  
-  def get_signs_for(self, child, binary_operator, is_first_child):
+      raise ValueError(
+        f'binary operator must be one of {OPERATORS}.'
+      )
     
-    if is_first_child or binary_operator in [ADD, MULTIPLY]:
+    if binary_operator in [ADD, MULTIPLY]:
       operator_sign = 1
     else:
       operator_sign = -1
     
-    if self.type == child.type:
-      return (operator_sign * sign for sign in child.signs)
+    # Flatten out children of the same type, keep the others as they are
+    if child_1.type == expression_type:
+      parts_1 = child_1.parts
+      signs_1 = child_1.signs
+    else:
+      parts_1 = (child_1,)
+      signs_1 = (1,)
+    if child_2.type == expression_type:
+      parts_2 = child_2.parts
+      if operator_sign == 1:
+        signs_2 = child_2.signs
+      else:
+        signs_2 = tuple(-sign for sign in child_2.signs)
+    else:
+      parts_2 = (child_2,)
+      signs_2 = (operator_sign,)
+    
+    parts = parts_1 + parts_2
+    signs = signs_1 + signs_2
+    sorted_parts_and_signs = \
+            sorted(
+              zip(parts, signs),
+              key=Expression.parts_and_signs_sort_key,
+            )
+    parts, signs = zip(*sorted_parts_and_signs)
+    
+    return expression_type, parts, signs
+  
+  @staticmethod
+  def extend(child_1, child_2, binary_operator):
+    """
+    Compute the canonical (type, parts, signs) of a canonical combination.
+    
+    For a combination passing `is_canonical_combination`,
+    the right child is simply appended to the parts of the left child,
+    which are then already in canonical order, so no sorting is needed.
+    """
+    
+    if binary_operator in OPERATORS_ADDITIVE:
+      expression_type = Expression.TYPE_ADDITIVE
+    else:
+      expression_type = Expression.TYPE_MULTIPLICATIVE
+    
+    if binary_operator in [ADD, MULTIPLY]:
+      operator_sign = 1
     else:
-      return (operator_sign,)
+      operator_sign = -1
+    
+    if child_1.type == expression_type:
+      return (
+        expression_type,
+        child_1.parts + (child_2,),
+        child_1.signs + (operator_sign,),
+      )
+    
+    return expression_type, (child_1, child_2), (1, operator_sign)
+  
+  @property
+  def depth(self):
+    
+    if self.depth_cached is None:
+      self.depth_cached = \
+              max([part.depth + 1 for part in self.parts], default=0)
+    
+    return self.depth_cached
+  
+  @property
+  def rank(self):
+    
+    if self.rank_cached is None:
+      self.rank_cached = (
+        self.mass,
+        self.depth,
+        len(self.parts),
+        tuple(part.rank for part in self.parts),
+        -self.value,
+        self.type,
+      )
+    
+    return self.rank_cached
   
   @staticmethod
   def parts_and_signs_sort_key(part_and_sign):
@@ -162,7 +268,7 @@ class Expression:
     return self.hash
   
   def __eq__(self, other):
-    return (
+    return self is other or (
       self.value == other.value
         and
       self.type == other.type
@@ -177,6 +283,13 @@ class Expression:
   
   def __str__(self):
     
+    if self.string_cached is None:
+      self.string_cached = self.stringify()
+    
+    return self.string_cached
+  
+  def stringify(self):
+    
     if self.type == Expression.TYPE_CONSTANT:
       return str(self.value)
     else:
@@ -211,6 +324,214 @@ class Expression:
     return part_string
 
 
+class ExpressionStore:
+  """
+  An interning table of canonical expressions.
+  
+  Many combinations of sub-expressions have the same canonical form,
+  e.g. (a + b) + c and a + (b + c), and a solve builds each one repeatedly.
+  The store keeps a single shared `Expression` per canonical
+  (type, parts, signs), so that a duplicate combination only costs
+  its canonicalisation, and so that equal expressions are usually identical,
+  which lets `Expression.__eq__` succeed on an identity check.
+  """
+  
+  def __init__(self):
+    self.expression_from_key = {}
+  
+  def __len__(self):
+    return len(self.expression_from_key)
+  
+  def constant(self, integer):
+    
+    key = (Expression.TYPE_CONSTANT, integer)
+    expression = self.expression_from_key.get(key)
+    if expression is None:
+      expression = Expression(integer)
+      self.expression_from_key[key] = expression
+    
+    return expression
+  
+  def combine(self, child_1, child_2, binary_operator, is_canonical=False):
+    """
+    Get the shared expression for a combination, building it if new.
+    
+    If `is_canonical`, the combination must pass `is_canonical_combination`,
+    and its canonical form is found without sorting (see `Expression.extend`).
+    """
+    
+    if is_canonical:
+      canonicalise = Expression.extend
+    else:
+      canonicalise = Expression.canonicalise
+    
+    expression_type, parts, signs = \
+            canonicalise(child_1, child_2, binary_operator)
+    key = (expression_type, parts, signs)
+    expression = self.expression_from_key.get(key)
+    if expression is None:
+      expression = Expression.__new__(Expression)
+      expression.initialise(
+        expression_type,
+        child_1.constants + child_2.constants,
+        parts,
+        signs,
+        binary_operator(child_1.value, child_2.value),
+      )
+      self.expression_from_key[key] = expression
+    
+    return expression
+  
+  def discard(self, expression):
+    
+    if expression.type == Expression.TYPE_CONSTANT:
+      key = (Expression.TYPE_CONSTANT, expression.value)
+    else:
+      key = (expression.type, expression.parts, expression.signs)
+    
+    if self.expression_from_key.get(key) is expression:
+      del self.expression_from_key[key]
+
+
+class ExpressionSetMemo:
+  """
+  A memo of expression sets, keyed by sub-multiset of the input numbers.
+  
+  An expression does not record which input positions it uses,
+  so submasks of equal numbers (e.g. either 2 of 75 50 2 2)
+  have identical expression sets, and each distinct sub-multiset
+  (sorted tuple of numbers) need only be solved once.
+  A memo may also be passed to successive solves,
+  which then reuse the sets of the sub-multisets they share.
+  Sets are kept per `max_alternatives_count`, since pruning changes them,
+  and their expressions are interned in the memo's `expression_store`.
+  """
+  
+  def __init__(self, expression_store=None):
+    if expression_store is None:
+      expression_store = ExpressionStore()
+    self.expression_store = expression_store
+    self.expression_set_from_key = {}
+  
+  def __len__(self):
+    return len(self.expression_set_from_key)
+  
+  def get(self, multiset, max_alternatives_count=None):
+    return self.expression_set_from_key.get((max_alternatives_count, multiset))
+  
+  def add(self, multiset, max_alternatives_count, expression_set):
+    self.expression_set_from_key[(max_alternatives_count, multiset)] = \
+            expression_set
+
+
+class SolveStatistics:
+  """
+  Counters, timings and peak memory of a solve, for each mass.
+  
+  For each mass (number of input positions used), the fields are:
+  - masks: the number of input bitmasks processed
+  - pairs: the (expression, expression, operator) triples considered
+  - rejected: the pairs rejected by `might_be_useful`
+    or `is_canonical_combination`
+  - candidates: the expressions produced (including constants)
+  - built: the candidates whose canonical form was new, and so built
+  - duplicates: the candidates absorbed as duplicates
+  - pruned: the expressions dropped by `select_representatives`
+  - seconds: the wall time spent
+  - peak_kib: the peak resident memory of the process by the end
+  
+  When the work is spread over worker processes, their statistics
+  are merged in, the peak memory being that of the largest process;
+  with pruning, an expression built by several workers
+  then counts as pruned in each of them.
+  """
+  
+  FIELD_NAMES = (
+    'masks',
+    'pairs',
+    'rejected',
+    'candidates',
+    'built',
+    'duplicates',
+    'pruned',
+    'seconds',
+    'peak_kib',
+  )
+  
+  def __init__(self):
+    self.field_values_from_mass = {}
+  
+  def record(self, mass, **value_from_field_name):
+    
+    field_values = \
+            self.field_values_from_mass.setdefault(
+              mass,
+              dict.fromkeys(SolveStatistics.FIELD_NAMES, 0),
+            )
+    
+    for field_name, value in value_from_field_name.items():
+      if value is None:
+        continue
+      if field_name == 'peak_kib':
+        field_values[field_name] = max(field_values[field_name], value)
+      else:
+        field_values[field_name] += value
+  
+  def merge(self, other):
+    
+    for mass, field_values in other.field_values_from_mass.items():
+      self.record(mass, **field_values)
+  
+  def get_total(self, field_name):
+    
+    value_list = [
+      field_values[field_name]
+        for field_values in self.field_values_from_mass.values()
+    ]
+    
+    if field_name == 'peak_kib':
+      return max(value_list, default=0)
+    
+    return sum(value_list)
+  
+  def format(self):
+    """
+    Format as a tab-separated table, one row per mass and a total row.
+    """
+    
+    def format_value(value):
+      if isinstance(value, float):
+        return f'{value:.3f}'
+      return str(value)
+    
+    line_list = ['\t'.join(('mass', *SolveStatistics.FIELD_NAMES))]
+    for mass, field_values in sorted(self.field_values_from_mass.items()):
+      line_list.append(
+        '\t'.join(
+          (
+            str(mass),
+            *(
+              format_value(field_values[field_name])
+                for field_name in SolveStatistics.FIELD_NAMES
+            ),
+          )
+        )
+      )
+    line_list.append(
+      '\t'.join(
+        (
+          'total',
+          *(
+            format_value(self.get_total(field_name))
+              for field_name in SolveStatistics.FIELD_NAMES
+          ),
+        )
+      )
+    )
+    
+    return '\n'.join(line_list)
+
+
 def might_be_useful(expression_1, expression_2, binary_operator):
   """
   Pre-screen the usefulness before building a new expression.
@@ -223,8 +544,11 @@ def might_be_useful(expression_1, expression_2, binary_operator):
             x * y where x < y (prefer y * x)
             x * 1 (why bother)
   - Divisions of the following forms are useless:
-            x / y where x < y (not integer)
+            x / y where y does not divide x (not integer)
             x / 1 (why bother)
+  
+  Since the inputs are positive integers, every expression
+  that passes this screen also has a positive integer value.
   """
   
   if binary_operator == ADD:
@@ -233,128 +557,2148 @@ def might_be_useful(expression_1, expression_2, binary_operator):
   if binary_operator == SUBTRACT:
     return expression_1.value > expression_2.value
   
-  if binary_operator == MULTIPLY or binary_operator == DIVIDE:
+  if binary_operator == MULTIPLY:
     return expression_1.value >= expression_2.value > 1
   
+  if binary_operator == DIVIDE:
+    return (
+      expression_1.value >= expression_2.value > 1
+        and
+      expression_1.value % expression_2.value == 0
+    )
+  
   return False
 
 
-def is_valid(expression_1, expression_2, input_number_list):
+def is_canonical_combination(expression_1, expression_2, binary_operator):
+  """
+  Pre-screen a useful combination for being built the canonical way.
+  
+  A flattened expression (see `Expression`) can be built in many ways,
+  e.g. a + b - c as (a + b) - c, (a - c) + b or a + (b - c).
+  Only one of them is allowed, that which appends the parts
+  one at a time in canonical order:
+  - the right child is never of the type of the operator
+            a + (b - c) (prefer (a + b) - c)
+  - the right child (with the sign of the operator) never comes
+    before the last part of the left child (or the left child itself)
+    in the order of `Expression.parts_and_signs_sort_key`
+            (a - c) + b (prefer (a + b) - c)
+            (a + c) + b where b > c (prefer (a + b) + c)
+  This way, each expression is built once rather than once per way,
+  the prefixes it is built from being useful expressions in turn.
+  Assumes that `might_be_useful` holds.
+  """
   
-  constants = [*expression_1.constants, *expression_2.constants]
+  if binary_operator in OPERATORS_ADDITIVE:
+    expression_type = Expression.TYPE_ADDITIVE
+  else:
+    expression_type = Expression.TYPE_MULTIPLICATIVE
   
-  return all(
-    constants.count(constant) <= input_number_list.count(constant)
-    for constant in constants
-  )
+  if expression_2.type == expression_type:
+    return False
+  
+  if expression_1.type == expression_type:
+    last_part = expression_1.parts[-1]
+    last_sign = expression_1.signs[-1]
+  else:
+    last_part = expression_1
+    last_sign = 1
+  
+  if binary_operator in [ADD, MULTIPLY]:
+    if last_sign == -1:
+      return False
+  elif last_sign == 1:
+    return True
+  
+  if last_part.value != expression_2.value:
+    return last_part.value > expression_2.value
+  
+  return not expression_2 < last_part
 
 
 def is_positive_integer(number):
+  """
+  Tell whether a value is a positive integer (possibly as a float).
+  
+  The solver itself never needs this, since `might_be_useful` only lets
+  through combinations with positive integer values.
+  It is kept for callers checking expressions built by hand,
+  whose value may be a float after an inexact `divide`.
+  """
   
   return int(number) == number and number > 0
 
 
-def compute_expression_set(input_number_list):
+def select_representatives(expression_set, max_alternatives_count):
   """
-  Recursively compute the set of expressions.
+  Keep only the best few expressions of each value and type.
+  
+  For each (value, type), the (at most) `max_alternatives_count` expressions
+  which come first under the `Expression` ordering are kept.
+  The type matters as well as the value because it decides
+  how an expression is flattened into those built from it:
+  of 2 + 2 and 2 * 2, the first comes first,
+  but 75 / 5 - 2 * 2 comes before 75 / 5 - (2 + 2) = 75 / 5 - 2 - 2,
+  so keeping only 2 + 2 would lose the best expression for 11.
+  Kept per type, the representatives have been found to give
+  the same best expression of each value as no pruning at all,
+  though this is not guaranteed.
   """
   
-  input_number_count = len(input_number_list)
+  expression_list_from_key = {}
+  for expression in expression_set:
+    expression_list = \
+            expression_list_from_key.setdefault(
+              (expression.value, expression.type),
+              [],
+            )
+    expression_list.append(expression)
   
-  expression_set_from_mass = {
-    1: {Expression(number) for number in input_number_list}
+  return {
+    expression
+      for expression_list in expression_list_from_key.values()
+      for expression in sorted(expression_list)[:max_alternatives_count]
   }
+
+
+class Deadline:
+  """
+  A deadline for an anytime search.
+  
+  The search checks the deadline between units of work,
+  and stops early once it has passed, returning the best results so far.
+  Afterwards, `expired` tells whether the search was cut short,
+  i.e. whether its results are partial.
+  The time is monotonic and shared by worker processes.
+  """
   
-  for mass in range(2, input_number_count + 1):
-    expression_set_from_mass[mass] = set()
-    for mass_1 in range(1, mass):
-      mass_2 = mass - mass_1
-      for binary_operator in OPERATORS:
-        for expression_1 in expression_set_from_mass[mass_1]:
-          for expression_2 in expression_set_from_mass[mass_2]:
-            if might_be_useful(expression_1, expression_2, binary_operator) \
-            and is_valid(expression_1, expression_2, input_number_list):
-              expression = \
-                        Expression(expression_1, expression_2, binary_operator)
-              if is_positive_integer(expression.value):
-                expression_set_from_mass[mass].add(expression)
+  def __init__(self, time_limit):
+    self.time = time.monotonic() + time_limit
+    self.expired = False
   
-  return set.union(*expression_set_from_mass.values())
+  def has_expired(self):
+    
+    if not self.expired and time.monotonic() >= self.time:
+      self.expired = True
+    
+    return self.expired
 
 
-def check_is_positive_integer(number_argument):
+def compute_mask_list(input_number_list, max_mass=None):
+  """
+  Compute the input bitmasks in the order in which they are processed.
   
-  try:
-    number = int(number_argument)
-  except ValueError:
-    raise argparse.ArgumentTypeError(f"not integer: '{number_argument}'")
+  The masks are in order of mass, so that the cheap masses come first.
+  Within a mass, the masks with the largest sum of numbers come first,
+  since they are the most promising for reaching a typical target
+  (which matters when the search is cut short by a `Deadline`).
+  """
+  
+  input_number_count = len(input_number_list)
+  
+  def mask_sort_key(mask):
+    return (
+      mask.bit_count(),
+      -sum(
+        input_number
+          for index, input_number in enumerate(input_number_list)
+          if mask & (1 << index)
+      ),
+      mask,
+    )
   
-  if not number > 0:
-    raise argparse.ArgumentTypeError(f"not positive: '{number_argument}'")
+  mask_list = sorted(range(1, 1 << input_number_count), key=mask_sort_key)
+  if max_mass is not None:
+    mask_list = [mask for mask in mask_list if mask.bit_count() <= max_mass]
   
-  return number
+  return mask_list
 
 
-MAX_RESULTS_DEFAULT = 30
+def compute_multiset_from_mask(input_number_list):
+  """
+  Compute the sub-multiset (sorted tuple of numbers) of every input bitmask.
+  """
+  
+  return {
+    mask: tuple(
+      sorted(
+        input_number
+          for index, input_number in enumerate(input_number_list)
+          if mask & (1 << index)
+      )
+    )
+      for mask in range(1 << len(input_number_list))
+  }
 
 
-def parse_command_line_arguments():
+def compute_split_list(mask, multiset_from_mask):
+  """
+  Compute the splits (mask_1, mask ^ mask_1) of a mask that are worth making.
   
-  parser = \
-          argparse.ArgumentParser(
-            description='Solve a Countdown numbers game.'
-          )
+  Splits into the same ordered pair of sub-multisets
+  give the same combinations, so only the first of them is kept,
+  e.g. only one of the two ways of splitting 2 off 2 2 5.
+  The splits are listed by their mask_1.
+  """
   
-  parser.add_argument(
-    'target',
-    metavar='TARGET',
-    type=check_is_positive_integer,
-    help='target number (positive integer)',
-  )
+  mask_1_from_multiset_pair = {}
   
-  parser.add_argument(
-    'input_number_list',
-    metavar='NUMBER',
-    type=check_is_positive_integer,
-    nargs='+',
-    help='number (positive integer) that can be used to obtain the target',
-  )
+  mask_1 = (mask - 1) & mask
+  while mask_1 > 0:
+    multiset_pair = (
+      multiset_from_mask[mask_1],
+      multiset_from_mask[mask ^ mask_1],
+    )
+    mask_1_from_multiset_pair.setdefault(multiset_pair, mask_1)
+    mask_1 = (mask_1 - 1) & mask
   
-  parser.add_argument(
-    '-m', dest="max_results_count",
-    metavar='MAX_RESULTS',
-    type=int,
-    default=MAX_RESULTS_DEFAULT,
-    help=f'maximum number of output results (default {MAX_RESULTS_DEFAULT})',
-  )
+  return list(mask_1_from_multiset_pair.values())
+
+
+def combine_expression_sets(
+  expression_set_1,
+  expression_set_2,
+  expression_store=None,
+  is_canonical_only=True,
+):
+  """
+  Generate the useful canonical combinations of two sets of expressions.
+  
+  The expressions of the two sets must use disjoint input positions.
+  Only combinations passing `might_be_useful`
+  and `is_canonical_combination` are generated.
+  If `expression_store` is given, the combinations are interned in it.
+  
+  If not `is_canonical_only`, every combination passing `might_be_useful`
+  is generated (in canonical form), as is needed when the sets have been
+  pruned by `select_representatives`: the canonical way of building
+  an expression may then be lost along with a pruned prefix,
+  while another way of building it survives.
+  """
   
-  return parser.parse_args()
+  if expression_store is None:
+    expression_store = ExpressionStore()
+  
+  combine = expression_store.combine
+  
+  if not is_canonical_only:
+    for binary_operator in OPERATORS:
+      for expression_1 in expression_set_1:
+        for expression_2 in expression_set_2:
+          if might_be_useful(expression_1, expression_2, binary_operator):
+            yield combine(expression_1, expression_2, binary_operator)
+    return
+  
+  for binary_operator in OPERATORS:
+    # Right children of the type of the operator are never canonical
+    if binary_operator in OPERATORS_ADDITIVE:
+      expression_type = Expression.TYPE_ADDITIVE
+    else:
+      expression_type = Expression.TYPE_MULTIPLICATIVE
+    expression_list_2 = [
+      expression_2
+        for expression_2 in expression_set_2
+        if expression_2.type != expression_type
+    ]
+    for expression_1 in expression_set_1:
+      for expression_2 in expression_list_2:
+        if might_be_useful(expression_1, expression_2, binary_operator) \
+        and is_canonical_combination(
+          expression_1,
+          expression_2,
+          binary_operator,
+        ):
+          yield combine(expression_1, expression_2, binary_operator, True)
 
 
-def print_results(expression_list, max_results_count):
+def generate_expression_sets(
+  input_number_list,
+  max_alternatives_count=None,
+  max_mass=None,
+  expression_store=None,
+  statistics=None,
+  deadline=None,
+  memo=None,
+):
+  """
+  Generate the sets of expressions, one input bitmask at a time.
   
-  for expression in expression_list[:max_results_count]:
-    print(f'{int(expression.value)}\t{expression}')
+  Expressions are grouped by the bitmask of input positions they use,
+  so that only expressions using disjoint positions are ever combined.
+  Masks are processed in order of mass (number of positions used),
+  so the sets for both halves of a split are complete before they are needed,
+  and the pairs (mask, expression set) are yielded in that order
+  (see `compute_mask_list`).
+  The set for a mask is only computed for the first mask
+  of each distinct sub-multiset of the numbers, from its distinct splits
+  (see `compute_split_list`), and is then looked up in `memo`
+  (a fresh `ExpressionSetMemo` if not given), so that repeated numbers
+  cost proportionally less; the sets yielded must not be modified.
+  
+  If `max_alternatives_count` is given, only that many expressions
+  are kept for each (mask, value, type), see `select_representatives`.
+  This makes larger inputs feasible at the cost of some alternatives.
+  The combinations are then not restricted to canonical ones
+  (see `combine_expression_sets`), so that the expressions kept
+  are the best of all those buildable from the expressions kept before.
+  
+  If `max_mass` is given, masks of greater mass are not processed.
+  
+  Expressions are interned in `expression_store` (or that of `memo`),
+  so that identical subtrees are built once and shared.
+  
+  If `statistics` (a `SolveStatistics`) is given, the work is recorded in it.
+  
+  If `deadline` (a `Deadline`) is given and passes, the generation stops,
+  the last set yielded being only partly computed (and not memoised).
+  """
+  
+  if memo is None:
+    memo = ExpressionSetMemo(expression_store)
+  expression_store = memo.expression_store
+  
+  mask_list = compute_mask_list(input_number_list, max_mass)
+  multiset_from_mask = compute_multiset_from_mask(input_number_list)
+  
+  expression_set_from_mask = {}
+  
+  for mask in mask_list:
+    multiset = multiset_from_mask[mask]
+    expression_set = memo.get(multiset, max_alternatives_count)
+    if expression_set is not None:
+      expression_set_from_mask[mask] = expression_set
+      if statistics is not None:
+        statistics.record(mask.bit_count(), masks=1)
+      yield mask, expression_set
+      continue
+    if statistics is not None:
+      start_time = time.perf_counter()
+      store_size = len(expression_store)
+      pairs_count = 0
+      combinations_count = 0
+    expression_set = set()
+    if mask.bit_count() == 1:
+      number = input_number_list[mask.bit_length() - 1]
+      expression_set.add(expression_store.constant(number))
+    for mask_1 in compute_split_list(mask, multiset_from_mask):
+      if deadline is not None and deadline.has_expired():
+        break
+      mask_2 = mask ^ mask_1
+      expression_iterable = \
+              combine_expression_sets(
+                expression_set_from_mask[mask_1],
+                expression_set_from_mask[mask_2],
+                expression_store,
+                max_alternatives_count is None,
+              )
+      if statistics is not None:
+        expression_iterable = list(expression_iterable)
+        pairs_count += (
+          len(OPERATORS)
+            * len(expression_set_from_mask[mask_1])
+            * len(expression_set_from_mask[mask_2])
+        )
+        combinations_count += len(expression_iterable)
+      expression_set.update(expression_iterable)
+    if statistics is not None:
+      candidates_count = combinations_count + (mask.bit_count() == 1)
+      built_count = len(expression_store) - store_size
+      unpruned_count = len(expression_set)
+    if max_alternatives_count is not None:
+      representative_set = \
+              select_representatives(expression_set, max_alternatives_count)
+      for expression in expression_set - representative_set:
+        expression_store.discard(expression)
+      expression_set = representative_set
+    expression_set_from_mask[mask] = expression_set
+    if deadline is None or not deadline.expired:
+      memo.add(multiset, max_alternatives_count, expression_set)
+    if statistics is not None:
+      statistics.record(
+        mask.bit_count(),
+        masks=1,
+        pairs=pairs_count,
+        rejected=pairs_count - combinations_count,
+        candidates=candidates_count,
+        built=built_count,
+        duplicates=candidates_count - built_count,
+        pruned=unpruned_count - len(expression_set),
+        seconds=time.perf_counter() - start_time,
+        peak_kib=cli.get_peak_memory_kib(),
+      )
+    yield mask, expression_set
+    if deadline is not None and deadline.expired:
+      return
 
 
-def main():
+def compute_expression_set(
+  input_number_list,
+  max_alternatives_count=None,
+  statistics=None,
+  deadline=None,
+  memo=None,
+):
+  """
+  Recursively compute the set of expressions.
   
-  parsed_arguments = parse_command_line_arguments()
+  If `memo` (an `ExpressionSetMemo`) is given, it is used and added to.
+  """
   
-  target = parsed_arguments.target
-  input_number_list = parsed_arguments.input_number_list
-  max_results_count = parsed_arguments.max_results_count
+  return {
+    expression
+      for _, expression_set in
+        generate_expression_sets(
+          input_number_list,
+          max_alternatives_count,
+          statistics=statistics,
+          deadline=deadline,
+          memo=memo,
+        )
+      for expression in expression_set
+  }
+
+
+def compute_hit_set(
+  input_number_list,
+  target,
+  min_hits_count,
+  tolerance=0,
+  max_alternatives_count=None,
+  statistics=None,
+  deadline=None,
+  memo=None,
+):
+  """
+  Compute expressions within `tolerance` of the target, stopping early.
   
-  def expression_sort_key(expression):
-    return (abs(expression.value - target), expression)
+  Since mass is the leading component of the `Expression` ordering,
+  the search stops as soon as a mass has been finished
+  with at least `min_hits_count` hits, rather than enumerating everything.
+  For `tolerance=0`, the best `min_hits_count` hits are then the same
+  as those which a full enumeration would give.
+  """
+  
+  mask_last_from_mass = {
+    mask.bit_count(): mask
+      for mask in compute_mask_list(input_number_list)
+  }
+  hit_set = set()
+  
+  for mask, expression_set in \
+          generate_expression_sets(
+            input_number_list,
+            max_alternatives_count,
+            statistics=statistics,
+            deadline=deadline,
+            memo=memo,
+          ):
+    hit_set.update(
+      expression
+        for expression in expression_set
+        if abs(expression.value - target) <= tolerance
+    )
+    if mask == mask_last_from_mass[mask.bit_count()] \
+    and len(hit_set) >= min_hits_count:
+      break
+  
+  return hit_set
+
+
+def compute_target_hit_set(
+  input_number_list,
+  target,
+  tolerance=0,
+  max_alternatives_count=None,
+  statistics=None,
+  deadline=None,
+):
+  """
+  Compute every expression within `tolerance` of the target, from both ends.
+  
+  Only the masks of up to half the mass are generated forward,
+  with their expressions grouped by value.
+  The expressions of value t over a larger mask are instead found
+  backward from t: for each split of the mask with a generated side,
+  each value of that side and each operator determine the one value
+  needed of the other side (e.g. t - a for a + b = t, or t / a for a * b = t),
+  which is looked up if generated, or else found backward in turn.
+  So only values leading to the target are ever combined,
+  rather than every pair of expressions over the larger masks.
+  
+  The result is the same as filtering a full enumeration,
+  including with `max_alternatives_count` (the representatives of value t
+  being kept at each step).
+  If `statistics` is given, the forward generation is recorded in it.
+  If `deadline` is given and passes, the hits found so far are returned.
+  """
+  
+  input_number_count = len(input_number_list)
+  max_forward_mass = (input_number_count + 1) // 2
+  multiset_from_mask = compute_multiset_from_mask(input_number_list)
+  
+  expression_store = ExpressionStore()
+  expression_list_from_value_from_mask = {}
+  for mask, expression_set in \
+          generate_expression_sets(
+            input_number_list,
+            max_alternatives_count,
+            max_mass=max_forward_mass,
+            expression_store=expression_store,
+            statistics=statistics,
+            deadline=deadline,
+          ):
+    expression_list_from_value = {}
+    for expression in expression_set:
+      expression_list_from_value.setdefault(expression.value, []) \
+        .append(expression)
+    expression_list_from_value_from_mask[mask] = expression_list_from_value
+  
+  combine = expression_store.combine
+  expression_set_from_multiset_and_value = {}
+  
+  def find_expression_list(mask, value):
+    
+    if value <= 0:
+      return []
+    
+    if mask in expression_list_from_value_from_mask:
+      return expression_list_from_value_from_mask[mask].get(value, [])
+    
+    key = (multiset_from_mask[mask], value)
+    if key in expression_set_from_multiset_and_value:
+      return expression_set_from_multiset_and_value[key]
+    
+    expression_set = set()
+    
+    for mask_1 in compute_split_list(mask, multiset_from_mask):
+      if deadline is not None and deadline.has_expired():
+        break
+      mask_2 = mask ^ mask_1
+      if mask_1 in expression_list_from_value_from_mask:
+        for value_1, expression_list_1 in \
+                expression_list_from_value_from_mask[mask_1].items():
+          for binary_operator, value_2 in [
+            (ADD, value - value_1),
+            (SUBTRACT, value_1 - value),
+            (MULTIPLY, value // value_1 if value % value_1 == 0 else 0),
+            (DIVIDE, value_1 // value if value_1 % value == 0 else 0),
+          ]:
+            add_combinations(
+              expression_set,
+              expression_list_1,
+              find_expression_list(mask_2, value_2),
+              binary_operator,
+            )
+      else:
+        for value_2, expression_list_2 in \
+                expression_list_from_value_from_mask[mask_2].items():
+          for binary_operator, value_1 in [
+            (ADD, value - value_2),
+            (SUBTRACT, value + value_2),
+            (MULTIPLY, value // value_2 if value % value_2 == 0 else 0),
+            (DIVIDE, value * value_2),
+          ]:
+            add_combinations(
+              expression_set,
+              find_expression_list(mask_1, value_1),
+              expression_list_2,
+              binary_operator,
+            )
+    
+    if max_alternatives_count is not None:
+      expression_set = \
+              select_representatives(expression_set, max_alternatives_count)
+    
+    expression_set_from_multiset_and_value[key] = expression_set
+    
+    return expression_set
+  
+  def add_combinations(
+    expression_set,
+    expression_list_1,
+    expression_list_2,
+    binary_operator,
+  ):
+    if expression_list_1 and expression_list_2 and might_be_useful(
+      next(iter(expression_list_1)),
+      next(iter(expression_list_2)),
+      binary_operator,
+    ):
+      for expression_1 in expression_list_1:
+        for expression_2 in expression_list_2:
+          if max_alternatives_count is not None:
+            expression_set.add(
+              combine(expression_1, expression_2, binary_operator)
+            )
+          elif is_canonical_combination(
+            expression_1,
+            expression_2,
+            binary_operator,
+          ):
+            expression_set.add(
+              combine(expression_1, expression_2, binary_operator, True)
+            )
+  
+  hit_set = set()
+  
+  for mask in compute_mask_list(input_number_list):
+    if mask not in expression_list_from_value_from_mask \
+    and deadline is not None and deadline.has_expired():
+      break
+    for value in range(target - tolerance, target + tolerance + 1):
+      hit_set.update(find_expression_list(mask, value))
+  
+  return hit_set
+
+
+def select_closest(expression_iterable, target, max_results_count):
+  """
+  Select the expressions closest to the target, best first.
+  
+  Ties in distance are broken by the `Expression` ordering.
+  """
+  
+  def expression_sort_key(expression):
+    return (abs(expression.value - target), expression)
+  
+  return heapq.nsmallest(
+    max_results_count,
+    expression_iterable,
+    key=expression_sort_key,
+  )
+
+
+TASK_LISTS_PER_JOB = 4
+
+worker_expression_set_from_mask = None
+
+
+def initialise_split_worker(expression_set_from_mask):
+  """
+  Give a worker of `compute_closest_expression_list` the lower-mass sets.
+  """
+  
+  global worker_expression_set_from_mask
+  worker_expression_set_from_mask = expression_set_from_mask
+
+
+def compute_split_task_lists(
+  input_number_list,
+  max_alternatives_count,
+  expression_set_from_mask,
+  task_lists_count,
+):
+  """
+  Deal out the work of the two highest masses as tasks for the workers.
+  
+  Each task (mask, mask_1_list, mask_right_list, mask_left_list)
+  combines the given splits of a mask,
+  see `compute_split_expression_collection`.
+  The splits of the full mask into two lower-mass halves are a task each.
+  Each distinct sub-multiset of the second highest mass is computed once,
+  for the mask first giving it in the splits of the full mask,
+  and its expressions are then combined with the number remaining,
+  on the right and on the left as those splits require;
+  its splits are a task each, unless `max_alternatives_count` is given,
+  in which case the whole set is needed for the pruning
+  and so is a single task.
+  
+  The tasks are dealt out largest first to the least loaded of
+  `task_lists_count` lists, the size of a task being estimated
+  by the pairs it considers. Only the lists given tasks are returned.
+  """
+  
+  input_number_count = len(input_number_list)
+  mask_full = (1 << input_number_count) - 1
+  multiset_from_mask = compute_multiset_from_mask(input_number_list)
+  
+  def estimate_pairs_count(mask, mask_1):
+    return (
+      len(OPERATORS)
+        * len(expression_set_from_mask[mask_1])
+        * len(expression_set_from_mask[mask ^ mask_1])
+    )
+  
+  cost_and_task_list = []
+  mask_lists_from_multiset = {}
+  
+  for mask_1 in compute_split_list(mask_full, multiset_from_mask):
+    mask_2 = mask_full ^ mask_1
+    if mask_1.bit_count() == input_number_count - 1:
+      mask_lists = \
+              mask_lists_from_multiset.setdefault(
+                multiset_from_mask[mask_1],
+                (mask_1, [], []),
+              )
+      mask_lists[1].append(mask_full ^ mask_lists[0])
+    elif mask_2.bit_count() == input_number_count - 1:
+      mask_lists = \
+              mask_lists_from_multiset.setdefault(
+                multiset_from_mask[mask_2],
+                (mask_2, [], []),
+              )
+      mask_lists[2].append(mask_full ^ mask_lists[0])
+    else:
+      cost_and_task_list.append(
+        (estimate_pairs_count(mask_full, mask_1), (mask_full, [mask_1], [], []))
+      )
+  
+  for mask, mask_right_list, mask_left_list in \
+          mask_lists_from_multiset.values():
+    mask_1_list = compute_split_list(mask, multiset_from_mask)
+    # Combining with each single number costs about as much again
+    weight = 1 + len(mask_right_list) + len(mask_left_list)
+    if max_alternatives_count is None:
+      for mask_1 in mask_1_list:
+        cost_and_task_list.append(
+          (
+            weight * estimate_pairs_count(mask, mask_1),
+            (mask, [mask_1], mask_right_list, mask_left_list),
+          )
+        )
+    else:
+      cost_and_task_list.append(
+        (
+          weight * sum(
+            estimate_pairs_count(mask, mask_1) for mask_1 in mask_1_list
+          ),
+          (mask, mask_1_list, mask_right_list, mask_left_list),
+        )
+      )
+  
+  cost_and_task_list.sort(key=operator.itemgetter(0), reverse=True)
+  
+  task_lists = [[] for _ in range(task_lists_count)]
+  load_and_index_heap = [(0, index) for index in range(task_lists_count)]
+  for cost, task in cost_and_task_list:
+    load, index = heapq.heappop(load_and_index_heap)
+    task_lists[index].append(task)
+    heapq.heappush(load_and_index_heap, (load + cost, index))
+  
+  return [task_list for task_list in task_lists if task_list]
+
+
+def combine_split_list(
+  expression_set_from_mask,
+  mask,
+  mask_1_list,
+  expression_store,
+  deadline=None,
+  is_canonical_only=True,
+):
+  """
+  Combine the expression sets of some splits (mask_1, mask ^ mask_1) of a mask.
+  
+  Return the set of combinations, the number of pairs considered,
+  and the number of combinations produced.
+  For `is_canonical_only`, see `combine_expression_sets`.
+  """
+  
+  expression_set = set()
+  pairs_count = 0
+  combinations_count = 0
+  
+  for mask_1 in mask_1_list:
+    if deadline is not None and deadline.has_expired():
+      break
+    expression_set_1 = expression_set_from_mask[mask_1]
+    expression_set_2 = expression_set_from_mask[mask ^ mask_1]
+    expression_list = \
+            list(
+              combine_expression_sets(
+                expression_set_1,
+                expression_set_2,
+                expression_store,
+                is_canonical_only,
+              )
+            )
+    pairs_count += (
+      len(OPERATORS) * len(expression_set_1) * len(expression_set_2)
+    )
+    combinations_count += len(expression_list)
+    expression_set.update(expression_list)
+  
+  return expression_set, pairs_count, combinations_count
+
+
+def compute_split_expression_collection(
+  target,
+  max_results_count,
+  max_alternatives_count,
+  task_list,
+  record_statistics=False,
+  deadline=None,
+):
+  """
+  Do a worker's share of the work of the two highest masses.
+  
+  This is the work done by each worker of `compute_closest_expression_list`,
+  on the lower-mass sets given to `initialise_split_worker`.
+  Each task (mask, mask_1_list, mask_right_list, mask_left_list)
+  combines the splits in mask_1_list of the mask.
+  For a mask of the second highest mass, the resulting expressions
+  (pruned by `select_representatives` if `max_alternatives_count` is given)
+  are then combined with the single numbers in mask_right_list
+  as right operands and in mask_left_list as left operands,
+  giving their share of the full mask;
+  a task of the full mask itself has neither.
+  
+  To keep the amount sent back small, only the closest expressions
+  are returned, with the full-mask representatives
+  if `max_alternatives_count` is given (since the final selection of those
+  needs every worker's share), else an empty tuple.
+  These are returned along with a `SolveStatistics` for the work
+  if `record_statistics` is true, else None,
+  and whether the work was cut short by `deadline`.
+  """
+  
+  expression_set_from_mask = worker_expression_set_from_mask
+  expression_store = ExpressionStore()
+  statistics = SolveStatistics() if record_statistics else None
+  
+  closest_set = set()
+  full_mask_expression_set = set()
+  
+  def combine_and_record(mask, mask_1_list, expression_set_from_mask):
+    start_time = time.perf_counter()
+    store_size = len(expression_store)
+    expression_set, pairs_count, combinations_count = \
+            combine_split_list(
+              expression_set_from_mask,
+              mask,
+              mask_1_list,
+              expression_store,
+              deadline,
+              max_alternatives_count is None,
+            )
+    if statistics is not None:
+      built_count = len(expression_store) - store_size
+      statistics.record(
+        mask.bit_count(),
+        pairs=pairs_count,
+        rejected=pairs_count - combinations_count,
+        candidates=combinations_count,
+        built=built_count,
+        duplicates=combinations_count - built_count,
+        seconds=time.perf_counter() - start_time,
+        peak_kib=cli.get_peak_memory_kib(),
+      )
+    return expression_set
+  
+  for mask, mask_1_list, mask_right_list, mask_left_list in task_list:
+    if deadline is not None and deadline.has_expired():
+      break
+    expression_set = \
+            combine_and_record(mask, mask_1_list, expression_set_from_mask)
+    if not mask_right_list and not mask_left_list:
+      full_mask_expression_set.update(expression_set)
+      continue
+    if max_alternatives_count is not None:
+      unpruned_count = len(expression_set)
+      expression_set = \
+              select_representatives(expression_set, max_alternatives_count)
+      if statistics is not None:
+        statistics.record(
+          mask.bit_count(),
+          pruned=unpruned_count - len(expression_set),
+        )
+    closest_set.update(
+      select_closest(expression_set, target, max_results_count)
+    )
+    for mask_single, mask_1 in [
+      *((mask_single, mask) for mask_single in mask_right_list),
+      *((mask_single, mask_single) for mask_single in mask_left_list),
+    ]:
+      full_mask_expression_set.update(
+        combine_and_record(
+          mask | mask_single,
+          [mask_1],
+          {
+            mask: expression_set,
+            mask_single: expression_set_from_mask[mask_single],
+          },
+        )
+      )
+  
+  if max_alternatives_count is not None:
+    full_mask_collection = \
+            select_representatives(
+              full_mask_expression_set,
+              max_alternatives_count,
+            )
+    if statistics is not None:
+      statistics.record(
+        max(expression_set_from_mask).bit_length(), # the full mass
+        pruned=len(full_mask_expression_set) - len(full_mask_collection),
+      )
+  else:
+    full_mask_collection = ()
+    closest_set.update(
+      select_closest(full_mask_expression_set, target, max_results_count)
+    )
+  
+  closest_list = select_closest(closest_set, target, max_results_count)
+  is_partial = deadline is not None and deadline.expired
+  
+  return closest_list, full_mask_collection, statistics, is_partial
+
+
+def compute_closest_expression_list(
+  input_number_list,
+  target,
+  max_results_count,
+  max_alternatives_count=None,
+  jobs_count=1,
+  statistics=None,
+  deadline=None,
+  memo=None,
+):
+  """
+  Compute the expressions closest to the target, best first.
+  
+  With `jobs_count` greater than 1, the masses up to the third highest
+  are computed once here (a few percent of the work),
+  and the two highest masses, where nearly all of the work lies,
+  are dealt out to that many worker processes, each of which is sent
+  the lower-mass sets once (pickled, costing a few percent more).
+  The tasks are dealt into `TASK_LISTS_PER_JOB` lists per worker
+  (see `compute_split_task_lists`), each taken by the next free worker,
+  which evens out the errors in the estimated sizes of the tasks.
+  Each worker returns its own closest expressions,
+  which include every overall closest expression it produced,
+  so merging them gives the same results as a single process.
+  
+  If `statistics` (a `SolveStatistics`) is given, the work is recorded in it,
+  including that of the workers.
+  
+  If `deadline` (a `Deadline`) is given, the search stops once it passes,
+  and the closest expressions found so far are returned,
+  `deadline.expired` then being true.
+  
+  If `memo` (an `ExpressionSetMemo`) is given, it is used and added to,
+  except for the two highest masses when their work is done by workers.
+  """
+  
+  input_number_count = len(input_number_list)
+  is_memoised = \
+          memo is not None \
+          and memo.get(
+            tuple(sorted(input_number_list)),
+            max_alternatives_count,
+          ) is not None
+  
+  if jobs_count <= 1 or input_number_count < 3 or is_memoised:
+    return select_closest(
+      compute_expression_set(
+        input_number_list,
+        max_alternatives_count,
+        statistics,
+        deadline,
+        memo,
+      ),
+      target,
+      max_results_count,
+    )
+  
+  expression_set_from_mask = \
+          dict(
+            generate_expression_sets(
+              input_number_list,
+              max_alternatives_count,
+              max_mass=input_number_count - 2,
+              statistics=statistics,
+              deadline=deadline,
+              memo=memo,
+            )
+          )
+  expression_set = set().union(*expression_set_from_mask.values())
+  
+  if deadline is not None and deadline.expired:
+    return select_closest(expression_set, target, max_results_count)
+  
+  if statistics is not None:
+    statistics.record(input_number_count - 1, masks=input_number_count)
+    statistics.record(input_number_count, masks=1)
+  
+  # Not fork, which is unsafe on some platforms and from the server's threads
+  if 'forkserver' in multiprocessing.get_all_start_methods():
+    multiprocessing_context = multiprocessing.get_context('forkserver')
+  else:
+    multiprocessing_context = None
+  
+  with concurrent.futures.ProcessPoolExecutor(
+    jobs_count,
+    mp_context=multiprocessing_context,
+    initializer=initialise_split_worker,
+    initargs=(expression_set_from_mask,),
+  ) as executor:
+    
+    future_list = [
+      executor.submit(
+        compute_split_expression_collection,
+        target,
+        max_results_count,
+        max_alternatives_count,
+        task_list,
+        statistics is not None,
+        deadline,
+      )
+        for task_list in
+          compute_split_task_lists(
+            input_number_list,
+            max_alternatives_count,
+            expression_set_from_mask,
+            TASK_LISTS_PER_JOB * jobs_count,
+          )
+    ]
+    
+    full_mask_expression_set = set()
+    for future in future_list:
+      closest_list, full_mask_collection, worker_statistics, is_partial = \
+              future.result()
+      expression_set.update(closest_list)
+      full_mask_expression_set.update(full_mask_collection)
+      if statistics is not None:
+        statistics.merge(worker_statistics)
+      if is_partial:
+        deadline.expired = True
+  
+  if max_alternatives_count is not None:
+    unpruned_count = len(full_mask_expression_set)
+    full_mask_expression_set = \
+            select_representatives(
+              full_mask_expression_set,
+              max_alternatives_count,
+            )
+    if statistics is not None:
+      statistics.record(
+        input_number_count,
+        pruned=unpruned_count - len(full_mask_expression_set),
+      )
+  
+  return select_closest(
+    expression_set | full_mask_expression_set,
+    target,
+    max_results_count,
+  )
+
+
+class ReachabilityTable:
+  """
+  A table of the best expression for every reachable value.
+  
+  Built once per set of input numbers, the table then answers
+  any number of targets by lookup rather than by searching again.
+  The entries are expressions when computed,
+  or their strings when read back from a file written by `write`.
+  """
+  
+  def __init__(self, expression_from_value):
+    self.expression_from_value = expression_from_value
+    self.sorted_value_list = sorted(expression_from_value)
+  
+  @staticmethod
+  def compute(
+    input_number_list,
+    max_alternatives_count=None,
+    statistics=None,
+  ):
+    
+    expression_from_value = {}
+    expression_set_pair_iterable = \
+            generate_expression_sets(
+              input_number_list,
+              max_alternatives_count,
+              statistics=statistics,
+            )
+    
+    for _, expression_set in expression_set_pair_iterable:
+      for expression in expression_set:
+        value = expression.value
+        if value not in expression_from_value \
+        or expression < expression_from_value[value]:
+          expression_from_value[value] = expression
+    
+    return ReachabilityTable(expression_from_value)
+  
+  @staticmethod
+  def read(table_file):
+    
+    expression_from_value = {}
+    
+    for line in table_file.read().splitlines():
+      value_string, expression_string = line.split('\t')
+      expression_from_value[int(value_string)] = expression_string
+    
+    return ReachabilityTable(expression_from_value)
+  
+  def write(self, table_file):
+    for value in self.sorted_value_list:
+      table_file.write(f'{value}\t{self.expression_from_value[value]}\n')
+  
+  def lookup(self, target):
+    """
+    Look up the reachable value nearest the target, and its expression.
+    
+    Ties in distance are broken in favour of the lower value.
+    Returns (value, expression), or None if the table is empty.
+    """
+    
+    index = bisect.bisect_left(self.sorted_value_list, target)
+    candidate_value_list = self.sorted_value_list[max(index - 1, 0):index + 1]
+    
+    if not candidate_value_list:
+      return None
+    
+    value = min(
+      candidate_value_list,
+      key=lambda value: (abs(value - target), value),
+    )
+    return value, self.expression_from_value[value]
+
+
+class IncrementalSolver:
+  """
+  A solver for numbers which are revealed one at a time, before the target.
+  
+  Each `add_number` extends the expressions with only those
+  involving the new number: the expression sets of the sub-multisets
+  of the earlier numbers are kept in an `ExpressionSetMemo`,
+  so that only the masks including the new number are computed
+  (and of those, only the sub-multisets not seen before).
+  The expressions are also indexed by value, so that `solve`,
+  once the target is revealed, is a lookup rather than a search,
+  giving the same results as `compute_closest_expression_list`.
+  """
+  
+  def __init__(self, max_alternatives_count=None, statistics=None):
+    
+    self.max_alternatives_count = max_alternatives_count
+    self.statistics = statistics
+    self.input_number_list = []
+    self.memo = ExpressionSetMemo()
+    self.expression_set_from_value = {}
+    self.sorted_value_list = []
+  
+  def add_number(self, number):
+    
+    self.input_number_list.append(number)
+    mask_new = 1 << (len(self.input_number_list) - 1)
+    
+    for mask, expression_set in \
+            generate_expression_sets(
+              self.input_number_list,
+              self.max_alternatives_count,
+              statistics=self.statistics,
+              memo=self.memo,
+            ):
+      if mask & mask_new:
+        for expression in expression_set:
+          self.expression_set_from_value \
+            .setdefault(expression.value, set()).add(expression)
+    
+    self.sorted_value_list = sorted(self.expression_set_from_value)
+  
+  def solve(self, target, max_results_count):
+    """
+    Look up the expressions closest to the target, best first.
+    
+    The values are visited outward from the target,
+    a distance at a time, until there are enough expressions.
+    """
+    
+    sorted_value_list = self.sorted_value_list
+    value_count = len(sorted_value_list)
+    index_upper = bisect.bisect_left(sorted_value_list, target)
+    index_lower = index_upper - 1
+    
+    expression_list = []
+    while len(expression_list) < max_results_count \
+    and (index_lower >= 0 or index_upper < value_count):
+      if index_upper == value_count:
+        distance = target - sorted_value_list[index_lower]
+      elif index_lower < 0:
+        distance = sorted_value_list[index_upper] - target
+      else:
+        distance = min(
+          target - sorted_value_list[index_lower],
+          sorted_value_list[index_upper] - target,
+        )
+      if index_lower >= 0 \
+      and target - sorted_value_list[index_lower] == distance:
+        expression_list.extend(
+          self.expression_set_from_value[sorted_value_list[index_lower]]
+        )
+        index_lower -= 1
+      if index_upper < value_count \
+      and sorted_value_list[index_upper] - target == distance:
+        expression_list.extend(
+          self.expression_set_from_value[sorted_value_list[index_upper]]
+        )
+        index_upper += 1
+    
+    return select_closest(expression_list, target, max_results_count)
+
+
+def parse_expression(string):
+  """
+  Parse an expression string, as made by `Expression.stringify`.
+  
+  The resulting `Expression` equals the one printed,
+  since an expression is built in canonical form whatever the grouping.
+  """
+  
+  token_list = re.findall(r'\d+|[-+*/()]', string)
+  position = 0
+  
+  def parse_binary(parse_operand, binary_operator_from_token):
+    nonlocal position
+    expression = parse_operand()
+    while position < len(token_list) \
+    and token_list[position] in binary_operator_from_token:
+      binary_operator = binary_operator_from_token[token_list[position]]
+      position += 1
+      expression = Expression(expression, parse_operand(), binary_operator)
+    return expression
+  
+  def parse_sum():
+    return parse_binary(parse_product, {'+': ADD, '-': SUBTRACT})
+  
+  def parse_product():
+    return parse_binary(parse_factor, {'*': MULTIPLY, '/': DIVIDE})
+  
+  def parse_factor():
+    nonlocal position
+    token = token_list[position]
+    position += 1
+    if token != '(':
+      return Expression(int(token))
+    expression = parse_sum()
+    position += 1 # ')'
+    return expression
+  
+  return parse_sum()
+
+
+class CachedExpression:
+  """
+  An expression read back from a `SolutionCache`, as its value and string.
+  
+  Cached expressions are ordered like the expressions they stand for,
+  the string being parsed for its rank only when they are compared
+  (which is only for ties in distance from the target).
+  """
+  
+  __slots__ = ('value', 'string', 'rank_cached')
+  
+  def __init__(self, value, string):
+    self.value = value
+    self.string = string
+    self.rank_cached = None
+  
+  @property
+  def rank(self):
+    
+    if self.rank_cached is None:
+      self.rank_cached = parse_expression(self.string).rank
+    
+    return self.rank_cached
+  
+  def __lt__(self, other):
+    return self.rank < other.rank
+  
+  def __str__(self):
+    return self.string
+
+
+class SolutionCache:
+  """
+  An on-disk cache of solutions, shared between runs and processes.
+  
+  For each draw, keyed by its sorted numbers and the solver `VERSION`,
+  the cache holds the best (at most) `ALTERNATIVES_COUNT` expressions
+  of every reachable value (in no particular order),
+  from which a repeated draw is answered for any target without searching.
+  (The first expression of each value makes up its reachability table.)
+  Expressions are held as strings, and returned as `CachedExpression`s.
+  They are stored in buckets of `BUCKET_SIZE` consecutive values,
+  each compressed on its own, so that answering a target
+  reads only the buckets around it.
+  
+  The cache is an SQLite database, opened afresh for each operation,
+  so that a cache can be shared by threads and worker processes;
+  it uses write-ahead logging, so that readers do not block writers.
+  Once it holds more than `max_entries_count` draws,
+  the least recently used are evicted, recency being a counter
+  bumped by every use (rather than a clock, which may go backwards).
+  
+  Bump `VERSION` whenever a change to the solver changes its results,
+  so that stale solutions are no longer used (and in time are evicted).
+  """
+  
+  VERSION = 1
+  ALTERNATIVES_COUNT = 30
+  BUCKET_SIZE = 64
+  MAX_ENTRIES_DEFAULT = 1000
+  TIMEOUT_SECONDS = 60
+  
+  def __init__(self, file_name, max_entries_count=MAX_ENTRIES_DEFAULT):
+    
+    self.file_name = file_name
+    self.max_entries_count = max_entries_count
+    
+    with contextlib.closing(self.connect()) as connection:
+      connection.execute('PRAGMA journal_mode = WAL')
+      connection.execute(
+        'CREATE TABLE IF NOT EXISTS draws ('
+        ' id INTEGER PRIMARY KEY,'
+        ' numbers TEXT NOT NULL,'
+        ' version INTEGER NOT NULL,'
+        ' last_used INTEGER NOT NULL,'
+        ' UNIQUE (numbers, version)'
+        ')'
+      )
+      connection.execute(
+        'CREATE TABLE IF NOT EXISTS buckets ('
+        ' draw_id INTEGER NOT NULL,'
+        ' bucket INTEGER NOT NULL,'
+        ' entries BLOB NOT NULL,'
+        ' PRIMARY KEY (draw_id, bucket)'
+        ') WITHOUT ROWID'
+      )
+  
+  def __len__(self):
+    
+    with contextlib.closing(self.connect()) as connection:
+      [(count,)] = connection.execute('SELECT COUNT(*) FROM draws')
+    
+    return count
+  
+  def connect(self):
+    return sqlite3.connect(
+      self.file_name,
+      timeout=SolutionCache.TIMEOUT_SECONDS,
+      isolation_level=None,
+    )
+  
+  @staticmethod
+  def get_numbers_key(input_number_list):
+    return ' '.join(str(number) for number in sorted(input_number_list))
+  
+  @staticmethod
+  def is_applicable(max_results_count, max_alternatives_count, first_only):
+    """
+    Tell whether a solve with these options can be answered from the cache.
+    
+    Only full searches (without `-k` or `-f`) are cached,
+    and they can only be answered for up to `ALTERNATIVES_COUNT` results.
+    """
+    
+    return (
+      max_alternatives_count is None
+        and
+      not first_only
+        and
+      max_results_count <= SolutionCache.ALTERNATIVES_COUNT
+    )
+  
+  def get(self, input_number_list, target, max_results_count):
+    """
+    Get cached expressions for a draw, or None if it is absent.
+    
+    The expressions returned include the `max_results_count` closest
+    to the target (see `select_closest`), and all others as close,
+    the buckets being read outwards from the target until these are known.
+    """
+    
+    numbers_key = SolutionCache.get_numbers_key(input_number_list)
+    bucket_size = SolutionCache.BUCKET_SIZE
+    
+    with contextlib.closing(self.connect()) as connection:
+      
+      # A single read transaction, so that the reads see one snapshot
+      # even if another process meanwhile replaces or evicts the draw
+      connection.execute('BEGIN')
+      try:
+        row = \
+                connection.execute(
+                  'SELECT id FROM draws WHERE numbers = ? AND version = ?',
+                  (numbers_key, SolutionCache.VERSION),
+                ).fetchone()
+        if row is None:
+          return None
+        [draw_id] = row
+        
+        def read_bucket(query):
+          row = connection.execute(query, (draw_id, bucket_bound)).fetchone()
+          if row is None:
+            return None
+          bucket, entries_blob = row
+          entries_string = zlib.decompress(entries_blob).decode('utf-8')
+          for line in entries_string.splitlines():
+            value_string, expression_string = line.split('\t')
+            expression_list.append(
+              CachedExpression(int(value_string), expression_string)
+            )
+          return bucket
+        
+        # The buckets [lower_bucket, upper_bucket) have been read
+        lower_bucket = upper_bucket = target // bucket_size
+        expression_list = []
+        while True:
+          lower_distance = target - lower_bucket * bucket_size + 1
+          upper_distance = upper_bucket * bucket_size - target
+          # Every expression not yet read is at least this far off
+          unread_distance = min(lower_distance, upper_distance)
+          if sum(
+            abs(expression.value - target) < unread_distance
+              for expression in expression_list
+          ) >= max_results_count:
+            break
+          if upper_distance <= lower_distance:
+            bucket_bound = upper_bucket
+            bucket = \
+                    read_bucket(
+                      'SELECT bucket, entries FROM buckets'
+                      ' WHERE draw_id = ? AND bucket >= ?'
+                      ' ORDER BY bucket LIMIT 1'
+                    )
+            upper_bucket = math.inf if bucket is None else bucket + 1
+          else:
+            bucket_bound = lower_bucket
+            bucket = \
+                    read_bucket(
+                      'SELECT bucket, entries FROM buckets'
+                      ' WHERE draw_id = ? AND bucket < ?'
+                      ' ORDER BY bucket DESC LIMIT 1'
+                    )
+            lower_bucket = -math.inf if bucket is None else bucket
+          if unread_distance == math.inf:
+            break
+      finally:
+        connection.execute('COMMIT')
+      
+      connection.execute(
+        'UPDATE draws SET last_used = (SELECT MAX(last_used) + 1 FROM draws)'
+        ' WHERE id = ?',
+        (draw_id,),
+      )
+    
+    return [
+      expression
+        for expression in expression_list
+        if abs(expression.value - target) < unread_distance
+    ]
+  
+  def put(self, input_number_list, expression_set):
+    """
+    Put the complete set of expressions for a draw into the cache.
+    
+    The best expressions of each value are selected value by value,
+    and only for values with more than `ALTERNATIVES_COUNT` expressions,
+    rather than by ordering the whole set.
+    """
+    
+    expression_list_from_value = {}
+    for expression in expression_set:
+      expression_list_from_value.setdefault(expression.value, []) \
+              .append(expression)
+    
+    line_list_from_bucket = {}
+    for value, expression_list in sorted(expression_list_from_value.items()):
+      if len(expression_list) > SolutionCache.ALTERNATIVES_COUNT:
+        expression_list = \
+                heapq.nsmallest(
+                  SolutionCache.ALTERNATIVES_COUNT,
+                  expression_list,
+                  key=operator.attrgetter('rank'),
+                )
+      line_list_from_bucket.setdefault(
+        value // SolutionCache.BUCKET_SIZE,
+        [],
+      ).extend(f'{value}\t{expression}' for expression in expression_list)
+    
+    with contextlib.closing(self.connect()) as connection:
+      connection.execute('BEGIN IMMEDIATE')
+      try:
+        connection.execute(
+          'INSERT OR REPLACE INTO draws (numbers, version, last_used)'
+          ' VALUES (?, ?, (SELECT COALESCE(MAX(last_used), 0) + 1 FROM draws))',
+          (
+            SolutionCache.get_numbers_key(input_number_list),
+            SolutionCache.VERSION,
+          ),
+        )
+        [(draw_id,)] = connection.execute('SELECT last_insert_rowid()')
+        connection.executemany(
+          'INSERT INTO buckets VALUES (?, ?, ?)',
+          (
+            (
+              draw_id,
+              bucket,
+              zlib.compress('\n'.join(line_list).encode('utf-8')),
+            )
+              for bucket, line_list in line_list_from_bucket.items()
+          ),
+        )
+        connection.execute(
+          'DELETE FROM draws WHERE id NOT IN'
+          ' (SELECT id FROM draws ORDER BY last_used DESC LIMIT ?)',
+          (self.max_entries_count,),
+        )
+        connection.execute(
+          'DELETE FROM buckets WHERE draw_id NOT IN (SELECT id FROM draws)'
+        )
+      except BaseException:
+        connection.execute('ROLLBACK')
+        raise
+      connection.execute('COMMIT')
+
+
+MAX_RESULTS_DEFAULT = 30
+MAX_QUERY_NUMBERS_COUNT = 7 # beyond which a query would hold up a server
+
+ENGINE_FORWARD = 'forward'
+ENGINE_TARGET = 'target'
+ENGINES = [ENGINE_FORWARD, ENGINE_TARGET]
+
+
+def parse_command_line_arguments():
+  
+  parser = \
+          argparse.ArgumentParser(
+            description='Solve a Countdown numbers game.'
+          )
+  
+  parser.add_argument(
+    'target',
+    metavar='TARGET',
+    type=cli.check_is_positive_integer,
+    nargs='?',
+    help='target number (positive integer)',
+  )
+  
+  parser.add_argument(
+    'input_number_list',
+    metavar='NUMBER',
+    type=cli.check_is_positive_integer,
+    nargs='*',
+    help='number (positive integer) that can be used to obtain the target',
+  )
+  
+  parser.add_argument(
+    '-m', dest="max_results_count",
+    metavar='MAX_RESULTS',
+    type=int,
+    default=MAX_RESULTS_DEFAULT,
+    help=f'maximum number of output results (default {MAX_RESULTS_DEFAULT})',
+  )
+  
+  parser.add_argument(
+    '-k', dest="max_alternatives_count",
+    metavar='MAX_ALTERNATIVES',
+    type=cli.check_is_positive_integer,
+    default=None,
+    help=(
+      'maximum number of expressions kept per value and type '
+      '(number, sum or product) for each subset of the numbers, '
+      'which may lose some alternative results (default no limit)'
+    ),
+  )
+  
+  parser.add_argument(
+    '-f', dest="first_only",
+    action='store_true',
+    help=(
+      'stop searching once MAX_RESULTS results within TOLERANCE '
+      'of the target have been found'
+    ),
+  )
+  
+  parser.add_argument(
+    '-t', dest="tolerance",
+    metavar='TOLERANCE',
+    type=cli.check_is_non_negative_integer,
+    default=0,
+    help=(
+      'maximum distance from the target for -f and -e target results '
+      '(default 0)'
+    ),
+  )
+  
+  parser.add_argument(
+    '-j', dest="jobs_count",
+    metavar='JOBS',
+    type=cli.check_is_positive_integer,
+    default=1,
+    help='number of worker processes (default 1)',
+  )
+  
+  parser.add_argument(
+    '-e', dest="engine",
+    choices=ENGINES,
+    default=ENGINE_FORWARD,
+    help=(
+      'engine: forward, building every expression from the numbers, '
+      'or target, searching back from the target for only the results '
+      'within TOLERANCE of it (default forward)'
+    ),
+  )
+  
+  parser.add_argument(
+    '-l', '--time-limit', dest="time_limit",
+    metavar='SECONDS',
+    type=cli.check_is_positive_float,
+    default=None,
+    help=(
+      'stop searching after SECONDS and print the best results so far, '
+      'noting on stderr if they are partial (default no limit)'
+    ),
+  )
+  
+  parser.add_argument(
+    '-o', dest="table_file",
+    metavar='TABLE_FILE',
+    type=argparse.FileType('w', encoding='UTF-8'),
+    default=None,
+    help=(
+      'write the best expression for every reachable value to TABLE_FILE, '
+      'and print only the one nearest the target '
+      '(of the other options, only with -k and --stats)'
+    ),
+  )
+  
+  parser.add_argument(
+    '-i', dest="table_input_file",
+    metavar='TABLE_FILE',
+    type=argparse.FileType('r', encoding='UTF-8'),
+    default=None,
+    help=(
+      'rather than solving, read the table written by -o from TABLE_FILE, '
+      'and print the entry nearest each TARGET, given as TARGET [TARGET ...]'
+    ),
+  )
+  
+  parser.add_argument(
+    '--stats', dest="show_statistics",
+    action='store_true',
+    help='print counters, timings and peak memory per mass to stderr',
+  )
+  
+  parser.add_argument(
+    '--serve', dest="serve",
+    action='store_true',
+    help=(
+      'rather than solving one game, answer JSON-lines queries '
+      'from stdin (or SOCKET), using the other options as defaults'
+    ),
+  )
+  
+  parser.add_argument(
+    '--socket', dest="socket_path",
+    metavar='SOCKET',
+    default=None,
+    help=(
+      'with --serve, listen on the Unix socket SOCKET; '
+      'otherwise have the game solved by the server listening on SOCKET'
+    ),
+  )
+  
+  parser.add_argument(
+    '--batch', dest="batch_file",
+    metavar='FILE',
+    type=argparse.FileType('r', encoding='UTF-8'),
+    default=None,
+    help=(
+      "rather than solving one game, solve the games in FILE ('-' for stdin), "
+      'one per line as TARGET NUMBER ... or a JSON query as for --serve, '
+      'printing a JSON answer line for each in order, '
+      'with JOBS games at a time'
+    ),
+  )
+  
+  parser.add_argument(
+    '--live', dest="live",
+    action='store_true',
+    help=(
+      'rather than solving one game, read the numbers from stdin '
+      'one per line as they are drawn, extending the search with each, '
+      "and print the results for the target of each line '= TARGET' "
+      '(of the other options, only with -m, -k and --stats)'
+    ),
+  )
+  
+  parser.add_argument(
+    '--cache', dest="cache_file_name",
+    metavar='CACHE_FILE',
+    default=None,
+    help=(
+      'keep the solutions of draws in the SQLite database CACHE_FILE, '
+      'shared between runs, and answer repeated draws from it '
+      'without searching (not with -f or -k, nor for MAX_RESULTS over '
+      f'{SolutionCache.ALTERNATIVES_COUNT})'
+    ),
+  )
+  
+  parser.add_argument(
+    '--cache-size', dest="cache_size",
+    metavar='DRAWS',
+    type=cli.check_is_positive_integer,
+    default=SolutionCache.MAX_ENTRIES_DEFAULT,
+    help=(
+      'maximum number of draws kept in CACHE_FILE, '
+      'the least recently used being evicted '
+      f'(default {SolutionCache.MAX_ENTRIES_DEFAULT})'
+    ),
+  )
+  
+  parsed_arguments = parser.parse_args()
+  
+  if parsed_arguments.serve or parsed_arguments.batch_file is not None \
+  or parsed_arguments.live:
+    if parsed_arguments.target is not None:
+      parser.error(
+        'arguments --serve, --batch, --live: not allowed with TARGET'
+      )
+  elif parsed_arguments.table_input_file is not None:
+    if parsed_arguments.target is None:
+      parser.error('the following arguments are required: TARGET')
+  elif parsed_arguments.target is None \
+  or not parsed_arguments.input_number_list:
+    parser.error('the following arguments are required: TARGET, NUMBER')
+  
+  is_given_from_option = {
+    '-m': parsed_arguments.max_results_count != MAX_RESULTS_DEFAULT,
+    '-k': parsed_arguments.max_alternatives_count is not None,
+    '-f': parsed_arguments.first_only,
+    '-t': parsed_arguments.tolerance != 0,
+    '-j': parsed_arguments.jobs_count != 1,
+    '-e': parsed_arguments.engine != ENGINE_FORWARD,
+    '-l': parsed_arguments.time_limit is not None,
+    '-o': parsed_arguments.table_file is not None,
+    '--stats': parsed_arguments.show_statistics,
+    '--serve': parsed_arguments.serve,
+    '--socket': parsed_arguments.socket_path is not None,
+    '--batch': parsed_arguments.batch_file is not None,
+    '--live': parsed_arguments.live,
+    '--cache': parsed_arguments.cache_file_name is not None,
+  }
+  
+  # Options which a mode would silently ignore
+  for mode_option, is_mode, ignored_option_list in [
+    (
+      '-o',
+      parsed_arguments.table_file is not None,
+      [
+        '-m', '-f', '-t', '-j', '-e', '-l',
+        '--serve', '--socket', '--batch', '--live', '--cache',
+      ],
+    ),
+    (
+      '--live',
+      parsed_arguments.live,
+      [
+        '-f', '-t', '-j', '-e', '-l',
+        '--serve', '--socket', '--batch', '--cache',
+      ],
+    ),
+    (
+      '-i',
+      parsed_arguments.table_input_file is not None,
+      [
+        '-m', '-k', '-f', '-t', '-j', '-e', '-l', '-o', '--stats',
+        '--serve', '--socket', '--batch', '--live', '--cache',
+      ],
+    ),
+  ]:
+    conflicting_option_list = [
+      option
+        for option in ignored_option_list
+        if is_given_from_option[option]
+    ]
+    if is_mode and conflicting_option_list:
+      parser.error(
+        f'argument {mode_option}: '
+        f'not allowed with {", ".join(conflicting_option_list)}'
+      )
+  
+  return parsed_arguments
+
+
+def print_results(expression_list, max_results_count):
+  
+  for expression in expression_list[:max_results_count]:
+    print(f'{expression.value}\t{expression}')
+
+
+def solve(
+  input_number_list,
+  target,
+  max_results_count=MAX_RESULTS_DEFAULT,
+  max_alternatives_count=None,
+  first_only=False,
+  tolerance=0,
+  jobs_count=1,
+  statistics=None,
+  deadline=None,
+  memo=None,
+  cache=None,
+  engine=ENGINE_FORWARD,
+):
+  """
+  Solve a game, returning the list of expressions closest to the target.
+  
+  The options are those of the command line,
+  with a `Deadline` for the time limit,
+  an `ExpressionSetMemo` to reuse between solves,
+  and a `SolutionCache` to reuse between runs.
+  
+  With `engine` ENGINE_TARGET, only the expressions within `tolerance`
+  of the target are searched for, see `compute_target_hit_set`
+  (`first_only`, `jobs_count`, `memo` and `cache` then being ignored).
+  
+  If `cache` is given and applies to the options, a cached draw
+  is answered without searching, as `CachedExpression`s;
+  otherwise the draw is solved in full (in a single process)
+  and put into the cache, unless the search was cut short.
+  """
+  
+  if engine not in ENGINES:
+    raise ValueError(f'engine must be one of {", ".join(ENGINES)}.')
+  
+  if engine == ENGINE_TARGET:
+    return select_closest(
+      compute_target_hit_set(
+        input_number_list,
+        target,
+        tolerance,
+        max_alternatives_count,
+        statistics,
+        deadline,
+      ),
+      target,
+      max_results_count,
+    )
+  
+  if cache is not None \
+  and SolutionCache.is_applicable(
+    max_results_count,
+    max_alternatives_count,
+    first_only,
+  ):
+    cached_expression_list = \
+            cache.get(input_number_list, target, max_results_count)
+    if cached_expression_list is None:
+      expression_set = \
+              compute_expression_set(
+                input_number_list,
+                statistics=statistics,
+                deadline=deadline,
+                memo=memo,
+              )
+      if deadline is None or not deadline.expired:
+        cache.put(input_number_list, expression_set)
+      return select_closest(expression_set, target, max_results_count)
+    return select_closest(cached_expression_list, target, max_results_count)
+  
+  if first_only:
+    return select_closest(
+      compute_hit_set(
+        input_number_list,
+        target,
+        max_results_count,
+        tolerance,
+        max_alternatives_count,
+        statistics,
+        deadline,
+        memo,
+      ),
+      target,
+      max_results_count,
+    )
+  
+  return compute_closest_expression_list(
+    input_number_list,
+    target,
+    max_results_count,
+    max_alternatives_count,
+    jobs_count,
+    statistics,
+    deadline,
+    memo,
+  )
+
+
+def answer_query(query, time_limit=None, **option_from_name):
+  """
+  Answer a JSON query for `daemon`, solving the game it describes.
+  
+  The query has the keys "target" and "numbers"
+  (at most `MAX_QUERY_NUMBERS_COUNT` of them),
+  and may override any of the server's options with the keys
+  "max_results", "max_alternatives", "first_only", "tolerance", "engine"
+  and "time_limit" (in seconds), which are checked as on the command line.
+  The answer has the key "results", a list of [value, expression string],
+  and if there is a time limit, the key "partial",
+  which is true if the search was cut short by it.
+  """
+  
+  target = query['target']
+  input_number_list = query['numbers']
+  
+  def check_is_positive_integer_value(name, value):
+    if type(value) is not int or value <= 0:
+      raise ValueError(f'{name} must be a positive integer.')
+  
+  check_is_positive_integer_value('target', target)
+  if not isinstance(input_number_list, list) or not input_number_list:
+    raise ValueError('numbers must be a non-empty list.')
+  if len(input_number_list) > MAX_QUERY_NUMBERS_COUNT:
+    raise ValueError(
+      f'numbers must have at most {MAX_QUERY_NUMBERS_COUNT} elements.'
+    )
+  for number in input_number_list:
+    check_is_positive_integer_value('number', number)
+  
+  option_from_name = dict(option_from_name)
+  if 'max_results' in query:
+    check_is_positive_integer_value('max_results', query['max_results'])
+    option_from_name['max_results_count'] = query['max_results']
+  if 'max_alternatives' in query:
+    if query['max_alternatives'] is not None:
+      check_is_positive_integer_value(
+        'max_alternatives',
+        query['max_alternatives'],
+      )
+    option_from_name['max_alternatives_count'] = query['max_alternatives']
+  if 'first_only' in query:
+    if type(query['first_only']) is not bool:
+      raise ValueError('first_only must be a boolean.')
+    option_from_name['first_only'] = query['first_only']
+  if 'tolerance' in query:
+    if type(query['tolerance']) is not int or query['tolerance'] < 0:
+      raise ValueError('tolerance must be a non-negative integer.')
+    option_from_name['tolerance'] = query['tolerance']
+  if 'engine' in query:
+    if query['engine'] not in ENGINES:
+      raise ValueError(f'engine must be one of {", ".join(ENGINES)}.')
+    option_from_name['engine'] = query['engine']
+  
+  time_limit = query.get('time_limit', time_limit)
+  if time_limit is None:
+    deadline = None
+  elif type(time_limit) in (int, float) and time_limit > 0:
+    deadline = Deadline(time_limit)
+  else:
+    raise ValueError('time_limit must be a positive number.')
+  
+  expression_list = \
+          solve(
+            input_number_list,
+            target,
+            **option_from_name,
+            deadline=deadline,
+          )
+  
+  answer = {
+    'results': [
+      [expression.value, str(expression)]
+        for expression in expression_list
+    ],
+  }
+  if deadline is not None:
+    answer['partial'] = deadline.expired
+  
+  return answer
+
+
+def parse_game_line(line):
+  """
+  Parse a game line of the form TARGET NUMBER ... into a query.
+  """
+  
+  try:
+    target, *input_number_list = [int(word) for word in line.split()]
+  except ValueError:
+    raise ValueError(f'invalid game line: {line.strip()!r}.')
+  
+  return {'target': target, 'numbers': input_number_list}
+
+
+def print_partial_note(is_partial, time_limit):
+  
+  if is_partial:
+    print(
+      f'partial results: the time limit of {time_limit}s was reached',
+      file=sys.stderr,
+    )
+
+
+def print_statistics(statistics):
+  
+  if statistics is not None:
+    print(statistics.format(), file=sys.stderr)
+
+
+def main():
+  
+  parsed_arguments = parse_command_line_arguments()
+  
+  target = parsed_arguments.target
+  input_number_list = parsed_arguments.input_number_list
+  max_results_count = parsed_arguments.max_results_count
+  max_alternatives_count = parsed_arguments.max_alternatives_count
+  first_only = parsed_arguments.first_only
+  tolerance = parsed_arguments.tolerance
+  jobs_count = parsed_arguments.jobs_count
+  table_file = parsed_arguments.table_file
+  table_input_file = parsed_arguments.table_input_file
+  show_statistics = parsed_arguments.show_statistics
+  serve = parsed_arguments.serve
+  socket_path = parsed_arguments.socket_path
+  batch_file = parsed_arguments.batch_file
+  time_limit = parsed_arguments.time_limit
+  engine = parsed_arguments.engine
+  live = parsed_arguments.live
+  cache_file_name = parsed_arguments.cache_file_name
+  cache_size = parsed_arguments.cache_size
+  
+  if cache_file_name is not None:
+    cache = SolutionCache(cache_file_name, cache_size)
+  else:
+    cache = None
+  
+  if table_input_file is not None:
+    with table_input_file:
+      reachability_table = ReachabilityTable.read(table_input_file)
+    if not reachability_table.sorted_value_list:
+      sys.exit('error: empty table')
+    # Here the numbers are further targets
+    for target in [target, *input_number_list]:
+      value, expression = reachability_table.lookup(target)
+      print(f'{value}\t{expression}')
+    return
+  
+  if batch_file is not None:
+    # Nothing needs loading, so the loader just returns the bound function
+    load_answer_query = \
+            functools.partial(
+              functools.partial,
+              answer_query,
+              time_limit=time_limit,
+              max_results_count=max_results_count,
+              max_alternatives_count=max_alternatives_count,
+              first_only=first_only,
+              tolerance=tolerance,
+              cache=cache,
+              engine=engine,
+            )
+    with batch_file:
+      daemon.serve_batch(
+        load_answer_query,
+        parse_game_line,
+        batch_file,
+        sys.stdout,
+        jobs_count,
+      )
+    return
+  
+  if serve:
+    answer_query_with_options = \
+            functools.partial(
+              answer_query,
+              time_limit=time_limit,
+              max_results_count=max_results_count,
+              max_alternatives_count=max_alternatives_count,
+              first_only=first_only,
+              tolerance=tolerance,
+              jobs_count=jobs_count,
+              cache=cache,
+              engine=engine,
+            )
+    if socket_path is None:
+      daemon.serve_stream(answer_query_with_options, sys.stdin, sys.stdout)
+    else:
+      daemon.serve_socket(answer_query_with_options, socket_path)
+    return
+  
+  if socket_path is not None:
+    query = {
+      'target': target,
+      'numbers': input_number_list,
+      'max_results': max_results_count,
+      'max_alternatives': max_alternatives_count,
+      'first_only': first_only,
+      'tolerance': tolerance,
+      'engine': engine,
+      'time_limit': time_limit,
+    }
+    [answer] = daemon.send_queries(socket_path, [query])
+    if 'error' in answer:
+      sys.exit(f'error: {answer["error"]}')
+    for value, expression_string in answer['results']:
+      print(f'{value}\t{expression_string}')
+    print_partial_note(answer.get('partial', False), time_limit)
+    return
+  
+  statistics = SolveStatistics() if show_statistics else None
+  deadline = Deadline(time_limit) if time_limit is not None else None
+  
+  if live:
+    incremental_solver = \
+            IncrementalSolver(max_alternatives_count, statistics)
+    for line in sys.stdin:
+      line = line.strip()
+      if not line:
+        continue
+      try:
+        if line.startswith('='):
+          target = cli.check_is_positive_integer(line[1:].strip())
+          print_results(
+            incremental_solver.solve(target, max_results_count),
+            max_results_count,
+          )
+        else:
+          incremental_solver.add_number(cli.check_is_positive_integer(line))
+      except argparse.ArgumentTypeError as exception:
+        print(f'error: {exception}', file=sys.stderr)
+      sys.stdout.flush()
+    print_statistics(statistics)
+    return
+  
+  if table_file is not None:
+    reachability_table = \
+            ReachabilityTable.compute(
+              input_number_list,
+              max_alternatives_count,
+              statistics,
+            )
+    with table_file:
+      reachability_table.write(table_file)
+    value, expression = reachability_table.lookup(target)
+    print(f'{value}\t{expression}')
+    print_statistics(statistics)
+    return
   
   expression_list = \
-          sorted(
-            compute_expression_set(input_number_list),
-            key=expression_sort_key
+          solve(
+            input_number_list,
+            target,
+            max_results_count,
+            max_alternatives_count,
+            first_only,
+            tolerance,
+            jobs_count,
+            statistics,
+            deadline,
+            cache=cache,
+            engine=engine,
           )
   
   print_results(expression_list, max_results_count)
+  print_partial_note(deadline is not None and deadline.expired, time_limit)
+  print_statistics(statistics)
 
 
 if __name__ == '__main__':
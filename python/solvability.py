@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+
+"""
+# solvability.py
+
+Build and query a database of solvable Countdown numbers games.
+
+Copyright 2022 Conway
+Licensed under the GNU General Public License v3.0 (GPL-3.0-only).
+This is free software with NO WARRANTY etc. etc., see LICENSE.
+
+The database covers every distinct draw of DRAW_SIZE numbers
+from the standard pool (two each of 1 to 10, one each of 25, 50, 75, 100)
+and every target from TARGET_MIN to TARGET_MAX.
+Building it takes a while, so it is done in two stages:
+
+1. `build`, which solves the draws into shard files in a work directory.
+   Each solved draw is one line, flushed to disk as soon as it is written,
+   so an interrupted build resumes where it left off.
+   Several builds (e.g. on several machines) may share the work
+   by using different shard indices (`-s SHARD_INDEX -n SHARD_COUNT`).
+2. `assemble`, which combines the shard files into a database file.
+
+The database file is laid out thus:
+        
+        header
+        pool                            (pool size)
+        entry for each draw             (draw count)
+        expression blob
+
+where the k-th entry corresponds to the k-th draw in `generate_draws` order,
+and consists of a bitmap of solvable targets, followed by the offset
+and size of the draw's block in the expression blob.
+The block holds the best expression for each solvable target,
+in order of target, one per line.
+Since the entries are of fixed size, a query costs one seek for the entry
+and one read for the block.
+"""
+
+
+import argparse
+import cli
+import collections
+import itertools
+import numbers
+import os
+import struct
+import sys
+
+
+POOL = [*range(1, 11), *range(1, 11), 25, 50, 75, 100]
+DRAW_SIZE = 6
+TARGET_MIN = 100
+TARGET_MAX = 999
+
+MAGIC = b'CDSD'
+VERSION = 1
+HEADER_FORMAT = '=4sIIIII'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+POOL_NUMBER_FORMAT = '=I'
+ENTRY_LOCATION_FORMAT = '=QI'
+
+
+def generate_draws(pool, draw_size):
+  """
+  Generate the distinct draws (as sorted tuples), in sorted order.
+  """
+  
+  return sorted(set(itertools.combinations(sorted(pool), draw_size)))
+
+
+def compute_completion_counts(number_count_list, draw_size):
+  """
+  Count the ways of completing a draw from each suffix of the numbers.
+  
+  The k-th list holds, for each size s up to `draw_size`,
+  the number of distinct draws of size s from the numbers
+  of index k onwards (the number of index k being available
+  `number_count_list[k]` times).
+  """
+  
+  completion_count_list_list = [[1] + [0] * draw_size]
+  
+  for number_count in reversed(number_count_list):
+    later_count_list = completion_count_list_list[0]
+    completion_count_list_list.insert(
+      0,
+      [
+        sum(
+          later_count_list[size - count]
+            for count in range(min(number_count, size) + 1)
+        )
+          for size in range(draw_size + 1)
+      ],
+    )
+  
+  return completion_count_list_list
+
+
+def compute_draw_index(pool, draw_size, draw):
+  """
+  Compute the index of a draw in `generate_draws` order, without generating.
+  
+  Sorted draws compare as their counts of each number
+  (in ascending order of number) do in reverse: more of a smaller number
+  comes first. So the draws before the given one are counted,
+  number by number, as those which take more of that number
+  (but the same of all smaller ones), and are completed in any way
+  from the larger numbers.
+  Returns None if the draw is not one of `generate_draws(pool, draw_size)`.
+  """
+  
+  pool_count_from_number = collections.Counter(pool)
+  draw_count_from_number = collections.Counter(draw)
+  if len(draw) != draw_size \
+  or any(
+    draw_count_from_number[number] > pool_count_from_number[number]
+      for number in draw_count_from_number
+  ):
+    return None
+  
+  number_list = sorted(pool_count_from_number)
+  completion_count_list_list = \
+          compute_completion_counts(
+            [pool_count_from_number[number] for number in number_list],
+            draw_size,
+          )
+  
+  draw_index = 0
+  remaining_size = draw_size
+  
+  for number_index, number in enumerate(number_list):
+    draw_count = draw_count_from_number[number]
+    later_count_list = completion_count_list_list[number_index + 1]
+    for count in range(
+      draw_count + 1,
+      min(pool_count_from_number[number], remaining_size) + 1,
+    ):
+      draw_index += later_count_list[remaining_size - count]
+    remaining_size -= draw_count
+  
+  return draw_index
+
+
+def compute_bitmap_size(target_min, target_max):
+  
+  return (target_max - target_min + 1 + 7) // 8
+
+
+def solve_draw(draw, target_min, target_max):
+  """
+  Compute the best expression string for each solvable target.
+  """
+  
+  reachability_table = numbers.ReachabilityTable.compute(list(draw))
+  
+  return {
+    value: str(expression)
+      for value, expression in
+        reachability_table.expression_from_value.items()
+      if target_min <= value <= target_max
+  }
+
+
+def read_shard_file(shard_file_name):
+  """
+  Read the solved draws from a shard file.
+  
+  Each line is of the form
+  
+          DRAW_INDEX <tab> TARGET=EXPRESSION <tab> TARGET=EXPRESSION ...
+  
+  A trailing partial line (from an interrupted build) is truncated away.
+  Returns a dict mapping draw index to a dict of expression from target.
+  """
+  
+  expression_from_target_from_draw_index = {}
+  
+  if not os.path.isfile(shard_file_name):
+    return expression_from_target_from_draw_index
+  
+  with open(shard_file_name, 'r+', encoding='UTF-8') as shard_file:
+    
+    content = shard_file.read()
+    complete_length = content.rfind('\n') + 1
+    if complete_length < len(content):
+      shard_file.truncate(len(content[:complete_length].encode('UTF-8')))
+    
+    for line in content[:complete_length].splitlines():
+      draw_index_string, *field_list = line.split('\t')
+      expression_from_target_from_draw_index[int(draw_index_string)] = {
+        int(target_string): expression_string
+          for field in field_list
+          for target_string, expression_string in [field.split('=')]
+      }
+  
+  return expression_from_target_from_draw_index
+
+
+def build_shard(
+  work_directory_name,
+  shard_index,
+  shard_count,
+  pool=POOL,
+  draw_size=DRAW_SIZE,
+  target_min=TARGET_MIN,
+  target_max=TARGET_MAX,
+):
+  """
+  Solve the draws belonging to a shard, resuming from any earlier progress.
+  
+  The shard consists of the draws whose index is `shard_index`
+  modulo `shard_count`.
+  """
+  
+  os.makedirs(work_directory_name, exist_ok=True)
+  shard_file_name = \
+          os.path.join(
+            work_directory_name,
+            f'shard-{shard_index}-of-{shard_count}.tsv',
+          )
+  solved_draw_index_set = set(read_shard_file(shard_file_name))
+  
+  with open(shard_file_name, 'a', encoding='UTF-8') as shard_file:
+    for draw_index, draw in enumerate(generate_draws(pool, draw_size)):
+      if draw_index % shard_count != shard_index \
+      or draw_index in solved_draw_index_set:
+        continue
+      expression_from_target = solve_draw(draw, target_min, target_max)
+      field_list = [
+        f'{target}={expression_from_target[target]}'
+          for target in sorted(expression_from_target)
+      ]
+      shard_file.write('\t'.join([str(draw_index), *field_list]) + '\n')
+      shard_file.flush()
+      os.fsync(shard_file.fileno())
+
+
+def assemble_database(
+  work_directory_name,
+  database_file_name,
+  pool=POOL,
+  draw_size=DRAW_SIZE,
+  target_min=TARGET_MIN,
+  target_max=TARGET_MAX,
+):
+  """
+  Combine the shard files of a work directory into a database file.
+  """
+  
+  expression_from_target_from_draw_index = {}
+  for file_name in sorted(os.listdir(work_directory_name)):
+    if file_name.startswith('shard-') and file_name.endswith('.tsv'):
+      expression_from_target_from_draw_index.update(
+        read_shard_file(os.path.join(work_directory_name, file_name))
+      )
+  
+  draw_list = generate_draws(pool, draw_size)
+  unsolved_draw_count = \
+          len(draw_list) - len(expression_from_target_from_draw_index)
+  if unsolved_draw_count > 0:
+    raise ValueError(f'{unsolved_draw_count} draws not yet solved')
+  
+  bitmap_size = compute_bitmap_size(target_min, target_max)
+  entry_bytes_list = []
+  block_bytes_list = []
+  block_offset = 0
+  
+  for draw_index in range(len(draw_list)):
+    expression_from_target = expression_from_target_from_draw_index[draw_index]
+    bitmap = bytearray(bitmap_size)
+    for target in expression_from_target:
+      bit_index = target - target_min
+      bitmap[bit_index // 8] |= 1 << (bit_index % 8)
+    block_bytes = ''.join(
+      f'{expression_from_target[target]}\n'
+        for target in sorted(expression_from_target)
+    ).encode('UTF-8')
+    entry_bytes_list.append(
+      bytes(bitmap)
+        +
+      struct.pack(ENTRY_LOCATION_FORMAT, block_offset, len(block_bytes))
+    )
+    block_bytes_list.append(block_bytes)
+    block_offset += len(block_bytes)
+  
+  temporary_file_name = f'{database_file_name}.{os.getpid()}.tmp'
+  with open(temporary_file_name, 'wb') as database_file:
+    database_file.write(
+      struct.pack(
+        HEADER_FORMAT,
+        MAGIC,
+        VERSION,
+        draw_size,
+        target_min,
+        target_max,
+        len(pool),
+      )
+    )
+    for number in pool:
+      database_file.write(struct.pack(POOL_NUMBER_FORMAT, number))
+    database_file.write(b''.join(entry_bytes_list))
+    database_file.write(b''.join(block_bytes_list))
+  os.replace(temporary_file_name, database_file_name)
+
+
+def query_database(database_file, target, input_number_list):
+  """
+  Look up the best expression for a draw and target.
+  
+  Returns None if the target is not solvable for the draw.
+  Raises ValueError if the draw or target is not covered by the database.
+  """
+  
+  database_file.seek(0)
+  magic, version, draw_size, target_min, target_max, pool_size = \
+          struct.unpack(HEADER_FORMAT, database_file.read(HEADER_SIZE))
+  if magic != MAGIC or version != VERSION:
+    raise ValueError(f'not a version {VERSION} database file')
+  
+  pool_number_size = struct.calcsize(POOL_NUMBER_FORMAT)
+  pool = [
+    number
+      for number, in struct.iter_unpack(
+        POOL_NUMBER_FORMAT,
+        database_file.read(pool_size * pool_number_size),
+      )
+  ]
+  
+  draw = tuple(sorted(input_number_list))
+  draw_index = compute_draw_index(pool, draw_size, draw)
+  if draw_index is None:
+    raise ValueError(f'draw not in database: {draw}')
+  if not target_min <= target <= target_max:
+    raise ValueError(f'target not in database: {target}')
+  
+  bitmap_size = compute_bitmap_size(target_min, target_max)
+  entry_size = bitmap_size + struct.calcsize(ENTRY_LOCATION_FORMAT)
+  entries_offset = HEADER_SIZE + pool_size * pool_number_size
+  draw_count = \
+          compute_completion_counts(
+            list(collections.Counter(pool).values()),
+            draw_size,
+          )[0][draw_size]
+  blob_offset = entries_offset + draw_count * entry_size
+  
+  database_file.seek(entries_offset + draw_index * entry_size)
+  entry_bytes = database_file.read(entry_size)
+  bitmap = entry_bytes[:bitmap_size]
+  block_offset, block_size = \
+          struct.unpack(ENTRY_LOCATION_FORMAT, entry_bytes[bitmap_size:])
+  
+  bit_index = target - target_min
+  if not bitmap[bit_index // 8] & 1 << (bit_index % 8):
+    return None
+  
+  line_index = (
+    sum(byte.bit_count() for byte in bitmap[:bit_index // 8])
+      +
+    (bitmap[bit_index // 8] & ((1 << (bit_index % 8)) - 1)).bit_count()
+  )
+  
+  database_file.seek(blob_offset + block_offset)
+  block = database_file.read(block_size).decode('UTF-8')
+  
+  return block.splitlines()[line_index]
+
+
+def parse_command_line_arguments():
+  
+  parser = \
+          argparse.ArgumentParser(
+            description='Build and query a database of solvable numbers games.'
+          )
+  subparsers = parser.add_subparsers(dest='command', required=True)
+  
+  build_parser = \
+          subparsers.add_parser(
+            'build',
+            help='solve draws into shard files (resumable)',
+          )
+  build_parser.add_argument(
+    'work_directory_name',
+    metavar='WORK_DIRECTORY',
+    help='directory for the shard files',
+  )
+  build_parser.add_argument(
+    '-s', dest="shard_index",
+    metavar='SHARD_INDEX',
+    type=int,
+    default=0,
+    help='index of the shard to solve (default 0)',
+  )
+  build_parser.add_argument(
+    '-n', dest="shard_count",
+    metavar='SHARD_COUNT',
+    type=cli.check_is_positive_integer,
+    default=1,
+    help='number of shards the draws are split into (default 1)',
+  )
+  
+  assemble_parser = \
+          subparsers.add_parser(
+            'assemble',
+            help='combine shard files into a database file',
+          )
+  assemble_parser.add_argument(
+    'work_directory_name',
+    metavar='WORK_DIRECTORY',
+    help='directory containing the shard files',
+  )
+  assemble_parser.add_argument(
+    'database_file_name',
+    metavar='DATABASE',
+    help='database file name',
+  )
+  
+  query_parser = \
+          subparsers.add_parser(
+            'query',
+            help='look up the best expression for a draw and target',
+          )
+  query_parser.add_argument(
+    'database_file_name',
+    metavar='DATABASE',
+    help='database file name',
+  )
+  query_parser.add_argument(
+    'target',
+    metavar='TARGET',
+    type=cli.check_is_positive_integer,
+    help='target number (positive integer)',
+  )
+  query_parser.add_argument(
+    'input_number_list',
+    metavar='NUMBER',
+    type=cli.check_is_positive_integer,
+    nargs='+',
+    help='number (positive integer) of the draw',
+  )
+  
+  parsed_arguments = parser.parse_args()
+  
+  if parsed_arguments.command == 'build' \
+  and not 0 <= parsed_arguments.shard_index < parsed_arguments.shard_count:
+    parser.error('SHARD_INDEX must be less than SHARD_COUNT')
+  
+  return parsed_arguments
+
+
+def main():
+  
+  parsed_arguments = parse_command_line_arguments()
+  command = parsed_arguments.command
+  
+  if command == 'build':
+    build_shard(
+      parsed_arguments.work_directory_name,
+      parsed_arguments.shard_index,
+      parsed_arguments.shard_count,
+    )
+  
+  elif command == 'assemble':
+    try:
+      assemble_database(
+        parsed_arguments.work_directory_name,
+        parsed_arguments.database_file_name,
+      )
+    except ValueError as error:
+      sys.exit(f'error: {error}')
+  
+  elif command == 'query':
+    target = parsed_arguments.target
+    with open(parsed_arguments.database_file_name, 'rb') as database_file:
+      try:
+        expression_string = \
+                query_database(
+                  database_file,
+                  target,
+                  parsed_arguments.input_number_list,
+                )
+      except ValueError as error:
+        sys.exit(f'error: {error}')
+    if expression_string is None:
+      print(f'{target}\tnot solvable')
+    else:
+      print(f'{target}\t{expression_string}')
+
+
+if __name__ == '__main__':
+  
+  main()
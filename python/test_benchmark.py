@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+"""
+# test_benchmark.py
+
+Perform unit testing for `benchmark.py`.
+
+Copyright 2022 Conway
+Licensed under the GNU General Public License v3.0 (GPL-3.0-only).
+This is free software with NO WARRANTY etc. etc., see LICENSE.
+"""
+
+
+import benchmark
+import os
+import tempfile
+import unittest
+
+
+class TestBenchmark(unittest.TestCase):
+  
+  def test_generate_numbers_corpus(self):
+    
+    corpus = benchmark.generate_numbers_corpus(1, 5)
+    self.assertEqual(corpus, benchmark.generate_numbers_corpus(1, 5))
+    self.assertNotEqual(corpus, benchmark.generate_numbers_corpus(2, 5))
+    self.assertEqual(len(corpus), len(benchmark.NUMBERS_DRAWS_FIXED) + 5)
+    
+    for target, input_number_list in corpus:
+      self.assertTrue(
+        benchmark.TARGET_MIN <= target <= benchmark.TARGET_MAX
+      )
+      self.assertEqual(len(input_number_list), 6)
+  
+  def test_generate_letters_corpus(self):
+    
+    corpus = benchmark.generate_letters_corpus(1, 10)
+    self.assertEqual(corpus, benchmark.generate_letters_corpus(1, 10))
+    self.assertNotEqual(corpus, benchmark.generate_letters_corpus(2, 10))
+    self.assertEqual(len(corpus), len(benchmark.LETTERS_RACKS_FIXED) + 10)
+    
+    for rack in corpus[len(benchmark.LETTERS_RACKS_FIXED):]:
+      self.assertEqual(len(rack), benchmark.RACK_SIZE)
+      vowel_count = sum(letter in benchmark.VOWELS for letter in rack)
+      self.assertTrue(3 <= vowel_count <= 5)
+  
+  def test_run_benchmark(self):
+    
+    with tempfile.TemporaryDirectory() as temporary_directory_name:
+      
+      word_list_file_name = os.path.join(temporary_directory_name, 'w.txt')
+      with open(word_list_file_name, 'w', encoding='utf-8') as word_list_file:
+        word_list_file.write('a\nan\nant\ntan\nnote\n')
+      
+      results = \
+              benchmark.run_benchmark(
+                ['letters-load', 'letters-signature'],
+                seed=1,
+                draw_count=0,
+                rack_count=4,
+                repeats_count=2,
+                word_list_file_name=word_list_file_name,
+              )
+    
+    self.assertEqual(results['seed'], 1)
+    self.assertEqual(
+      list(results['results']),
+      ['letters-load', 'letters-signature'],
+    )
+    self.assertEqual(results['results']['letters-load']['items'], 1)
+    self.assertEqual(
+      results['results']['letters-signature']['items'],
+      len(benchmark.LETTERS_RACKS_FIXED) + 4,
+    )
+    for result in results['results'].values():
+      self.assertGreaterEqual(result['seconds'], 0)
+      self.assertGreaterEqual(result['setup_seconds'], 0)
+  
+  def test_compare_results(self):
+    
+    def make_results(seconds, peak_kib, seed=1):
+      return {
+        'seed': seed,
+        'draw_count': 2,
+        'rack_count': 3,
+        'results': {
+          'numbers-first': {'seconds': seconds, 'peak_kib': peak_kib},
+        },
+      }
+    
+    baseline_results = make_results(1.0, 1000)
+    
+    self.assertEqual(
+      benchmark.compare_results(
+        make_results(1.05, 1000),
+        baseline_results,
+        0.1,
+      ),
+      [],
+    )
+    self.assertEqual(
+      len(
+        benchmark.compare_results(
+          make_results(1.2, 1000),
+          baseline_results,
+          0.1,
+        )
+      ),
+      1,
+    )
+    self.assertEqual(
+      len(
+        benchmark.compare_results(
+          make_results(1.2, 1200),
+          baseline_results,
+          0.1,
+        )
+      ),
+      2,
+    )
+    self.assertEqual(
+      benchmark.compare_results(
+        make_results(1.2, 1200),
+        baseline_results,
+        0.5,
+      ),
+      [],
+    )
+    self.assertRaises(
+      ValueError,
+      benchmark.compare_results,
+      make_results(1.0, 1000, seed=2),
+      baseline_results,
+      0.1,
+    )
+
+
+if __name__ == '__main__':
+  unittest.main()
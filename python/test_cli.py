@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+
+"""
+# test_cli.py
+
+Perform unit testing for `cli.py`.
+
+Copyright 2022 Conway
+Licensed under the GNU General Public License v3.0 (GPL-3.0-only).
+This is free software with NO WARRANTY etc. etc., see LICENSE.
+"""
+
+
+import argparse
+import cli
+import unittest
+
+
+class TestCli(unittest.TestCase):
+  
+  def test_check_is_positive_integer(self):
+    
+    self.assertEqual(cli.check_is_positive_integer('7'), 7)
+    for number_argument in ['0', '-1', '1.5', 'x']:
+      self.assertRaises(
+        argparse.ArgumentTypeError,
+        cli.check_is_positive_integer,
+        number_argument,
+      )
+  
+  def test_check_is_non_negative_integer(self):
+    
+    self.assertEqual(cli.check_is_non_negative_integer('0'), 0)
+    self.assertEqual(cli.check_is_non_negative_integer('7'), 7)
+    for number_argument in ['-1', '1.5', 'x']:
+      self.assertRaises(
+        argparse.ArgumentTypeError,
+        cli.check_is_non_negative_integer,
+        number_argument,
+      )
+  
+  def test_check_is_positive_float(self):
+    
+    self.assertEqual(cli.check_is_positive_float('0.5'), 0.5)
+    for number_argument in ['0', '-1', 'x']:
+      self.assertRaises(
+        argparse.ArgumentTypeError,
+        cli.check_is_positive_float,
+        number_argument,
+      )
+  
+  def test_get_peak_memory_kib(self):
+    
+    peak_memory_kib = cli.get_peak_memory_kib()
+    if cli.resource is None:
+      self.assertIsNone(peak_memory_kib)
+    else:
+      self.assertGreater(peak_memory_kib, 0)
+
+
+if __name__ == '__main__':
+  
+  unittest.main()
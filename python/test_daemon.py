@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+
+"""
+# test_daemon.py
+
+Perform unit testing for `daemon.py`.
+
+Copyright 2022 Conway
+Licensed under the GNU General Public License v3.0 (GPL-3.0-only).
+This is free software with NO WARRANTY etc. etc., see LICENSE.
+"""
+
+
+import daemon
+import io
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+
+
+def answer_query(query):
+  
+  if query['x'] < 0:
+    raise ValueError('x must be non-negative.')
+  if query['x'] == 0:
+    raise MemoryError('out of memory.')
+  
+  return {'y': 2 * query['x']}
+
+
+def load_answer_query():
+  return answer_query
+
+
+def parse_line(line):
+  
+  if line.strip() == 'x':
+    raise ValueError('x must be given as JSON.')
+  
+  return {'x': int(line)}
+
+
+class TestDaemon(unittest.TestCase):
+  
+  def test_serve_stream(self):
+    
+    input_file = io.StringIO(
+      '{"x": 1}\n'
+      '\n'
+      '{"x": -1}\n'
+      '{"z": 1}\n'
+      '[1]\n'
+      'nonsense\n'
+      '{"x": 0}\n'
+      '{"x": 3}\n'
+    )
+    output_file = io.StringIO()
+    daemon.serve_stream(answer_query, input_file, output_file)
+    
+    self.assertEqual(
+      output_file.getvalue().splitlines(),
+      [
+        '{"y": 2}',
+        '{"error": "x must be non-negative."}',
+        '{"error": "missing key \'x\'."}',
+        '{"error": "query must be a JSON object."}',
+        '{"error": "Expecting value: line 1 column 1 (char 0)"}',
+        '{"error": "MemoryError: out of memory."}',
+        '{"y": 6}',
+      ],
+    )
+  
+  def test_serve_batch(self):
+    
+    input_line_list = ['1\n', '\n', '{"x": 2}\n', 'x\n', '-1\n', '3\n']
+    expected_output_line_list = [
+      '{"y": 2}',
+      '{"y": 4}',
+      '{"error": "x must be given as JSON."}',
+      '{"error": "x must be non-negative."}',
+      '{"y": 6}',
+    ]
+    
+    for jobs_count, chunk_size in [(1, 1), (2, 1), (3, 2)]:
+      output_file = io.StringIO()
+      daemon.serve_batch(
+        load_answer_query,
+        parse_line,
+        iter(input_line_list),
+        output_file,
+        jobs_count,
+        chunk_size,
+      )
+      self.assertEqual(
+        output_file.getvalue().splitlines(),
+        expected_output_line_list,
+      )
+  
+  def test_serve_batch_streaming(self):
+    
+    output_file = io.StringIO()
+    
+    def generate_lines():
+      # Like a pipe, the later games are only written once
+      # the answers to the earlier ones have been read
+      for x in range(1, 4):
+        yield f'{x}\n'
+      deadline = time.monotonic() + 30
+      while output_file.getvalue().count('\n') < 3 \
+      and time.monotonic() < deadline:
+        time.sleep(0.01)
+      self.assertEqual(output_file.getvalue().count('\n'), 3)
+      yield '4\n'
+    
+    daemon.serve_batch(
+      load_answer_query,
+      parse_line,
+      generate_lines(),
+      output_file,
+      2,
+    )
+    self.assertEqual(
+      output_file.getvalue().splitlines(),
+      ['{"y": 2}', '{"y": 4}', '{"y": 6}', '{"y": 8}'],
+    )
+  
+  def test_serve_socket(self):
+    
+    with tempfile.TemporaryDirectory() as temporary_directory_name:
+      
+      socket_path = os.path.join(temporary_directory_name, 'socket')
+      server_thread = \
+              threading.Thread(
+                target=daemon.serve_socket,
+                args=(answer_query, socket_path),
+                daemon=True,
+              )
+      server_thread.start()
+      while not os.path.exists(socket_path):
+        time.sleep(0.01)
+      
+      self.assertEqual(
+        daemon.send_queries(socket_path, [{'x': 1}, {'x': -1}, {'x': 5}]),
+        [{'y': 2}, {'error': 'x must be non-negative.'}, {'y': 10}],
+      )
+      self.assertEqual(
+        daemon.send_queries(socket_path, [{'x': 7}]),
+        [{'y': 14}],
+      )
+      
+      daemon.remove_stale_socket(socket_path)
+      self.assertTrue(os.path.exists(socket_path))
+  
+  def test_remove_stale_socket(self):
+    
+    with tempfile.TemporaryDirectory() as temporary_directory_name:
+      
+      file_path = os.path.join(temporary_directory_name, 'file')
+      with open(file_path, 'w', encoding='UTF-8') as file:
+        file.write('precious\n')
+      daemon.remove_stale_socket(file_path)
+      self.assertTrue(os.path.exists(file_path))
+      self.assertRaises(OSError, daemon.serve_socket, answer_query, file_path)
+      self.assertTrue(os.path.exists(file_path))
+      
+      socket_path = os.path.join(temporary_directory_name, 'socket')
+      daemon.remove_stale_socket(socket_path)
+      with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server_socket:
+        server_socket.bind(socket_path)
+      daemon.remove_stale_socket(socket_path)
+      self.assertFalse(os.path.exists(socket_path))
+
+
+if __name__ == '__main__':
+  
+  unittest.main()
@@ -12,7 +12,11 @@ This is free software with NO WARRANTY etc. etc., see LICENSE.
 
 
 import letters
+import os
+import sys
+import tempfile
 import unittest
+import unittest.mock
 
 
 class TestLetters(unittest.TestCase):
@@ -31,6 +35,201 @@ class TestLetters(unittest.TestCase):
     self.assertFalse(letters.is_valid('A', 'X'))
     self.assertFalse(letters.is_valid('AA', 'A'))
     self.assertFalse(letters.is_valid('RADAR', 'DARAD'))
+  
+  def test_generate_sub_signatures(self):
+    self.assertCountEqual(letters.generate_sub_signatures(''), [''])
+    self.assertCountEqual(
+      letters.generate_sub_signatures('BAB'),
+      ['', 'A', 'B', 'AB', 'BB', 'ABB'],
+    )
+    self.assertEqual(
+      len(list(letters.generate_sub_signatures('ABCDEFGHI'))),
+      2 ** 9,
+    )
+  
+  def test_count_sub_signatures(self):
+    self.assertEqual(letters.count_sub_signatures(''), 1)
+    self.assertEqual(letters.count_sub_signatures('BAB'), 6)
+    self.assertEqual(letters.count_sub_signatures('ABCDEFGHI'), 2 ** 9)
+  
+  def test_find_word_indices_by_signature(self):
+    word_list = ['RADAR', 'A', 'DARN', 'AA', 'RAD', 'DRAW', 'ARD', 'DA']
+    word_index = letters.SignatureWordIndex(word_list)
+    self.assertEqual(len(word_index), 7)
+    for signature_lookup_cost in [letters.SIGNATURE_LOOKUP_COST, 0.01]:
+      with unittest.mock.patch.object(
+        letters,
+        'SIGNATURE_LOOKUP_COST',
+        signature_lookup_cost,
+      ):
+        self.assertEqual(
+          letters.find_word_indices_by_signature(word_index, 'RADAR'),
+          [0, 1, 3, 4, 6, 7],
+        )
+        self.assertEqual(
+          letters.find_word_indices_by_signature(word_index, 'XYZ'),
+          [],
+        )
+  
+  def test_compute_valid_word_list(self):
+    word_list = ['RADAR', 'A', 'DARN', 'AA', 'RAD', 'DRAW', 'ARD', 'DA']
+    word_index_list = [
+      letters.SignatureWordIndex(word_list),
+      letters.LetterCountWordIndex(word_list),
+      letters.DawgWordIndex(word_list),
+    ]
+    for input_letters, valid_word_list in [
+      ('RADAR', ['RADAR', 'A', 'AA', 'RAD', 'ARD', 'DA']),
+      ('DARN', ['A', 'DARN', 'RAD', 'ARD', 'DA']),
+      ('XYZ', []),
+    ]:
+      self.assertEqual(
+        letters.compute_valid_word_list(word_list, input_letters),
+        valid_word_list,
+      )
+      for word_index in word_index_list:
+        self.assertEqual(
+          letters.compute_valid_word_list(
+            word_list,
+            input_letters,
+            word_index,
+          ),
+          valid_word_list,
+        )
+  
+  def test_answer_query(self):
+    word_list = ['RADAR', 'A', 'DARN', 'AA', 'RAD', 'DRAW', 'ARD', 'DA']
+    for word_index in [None, letters.SignatureWordIndex(word_list)]:
+      self.assertEqual(
+        letters.answer_query({'letters': 'radar'}, word_list, word_index, 3),
+        {'results': [[5, 'RADAR'], [3, 'RAD'], [3, 'ARD']]},
+      )
+      self.assertEqual(
+        letters.answer_query(
+          {'letters': 'darn', 'max_results': 1},
+          word_list,
+          word_index,
+          3,
+        ),
+        {'results': [[4, 'DARN']]},
+      )
+    self.assertRaises(
+      ValueError,
+      letters.answer_query,
+      {'letters': ['D']},
+      word_list,
+      None,
+      3,
+    )
+  
+  def test_parse_game_line(self):
+    self.assertEqual(
+      letters.parse_game_line(' ahgroient\n'),
+      {'letters': 'ahgroient'},
+    )
+  
+  def test_dawg_word_index(self):
+    word_list = ['TAPS', 'PATS', 'TAP', 'PAT', 'TAPS', 'SPAT', 'AT', 'TA']
+    word_index = letters.DawgWordIndex(word_list)
+    self.assertEqual(word_index.root[1], 7)
+    self.assertEqual(word_index.find_word_indices('APTS'), list(range(8)))
+    self.assertEqual(word_index.find_word_indices('TAP'), [2, 3, 6, 7])
+    self.assertEqual(word_index.find_word_indices('XYZ'), [])
+    self.assertEqual(word_index.find_words('APTS'), word_list)
+    self.assertEqual(word_index.find_words('TAP'), ['TAP', 'PAT', 'AT', 'TA'])
+    self.assertEqual(word_index.find_words('XYZ'), [])
+    self.assertEqual(len(word_index.word_list), 8)
+    self.assertEqual(
+      [word_index.word_list[position] for position in range(8)],
+      word_list,
+    )
+  
+  def test_letter_count_word_index_fallback(self):
+    word_list = ['RADAR', 'A', 'DARN', 'AA', 'RAD', 'DRAW', 'ARD', 'DA']
+    with unittest.mock.patch.object(letters, 'import_numpy', lambda: None):
+      word_index = letters.LetterCountWordIndex(word_list)
+      self.assertEqual(word_index.alphabet, ['A', 'D', 'N', 'R', 'W'])
+      self.assertEqual(word_index.find_word_indices('DARN'), [1, 2, 4, 6, 7])
+  
+  @unittest.skipIf(letters.import_numpy() is None, 'NumPy is not installed')
+  def test_letter_count_word_index_numpy(self):
+    word_list = ['RADAR', 'A', 'DARN', 'AA', 'RAD', 'DRAW', 'ARD', 'DA']
+    word_index = letters.LetterCountWordIndex(word_list)
+    self.assertEqual(word_index.letter_count_matrix.shape, (8, 5))
+    self.assertEqual(word_index.find_word_indices('DARN'), [1, 2, 4, 6, 7])
+    self.assertEqual(
+      word_index.find_word_indices('RADAR'),
+      [0, 1, 3, 4, 6, 7],
+    )
+    self.assertEqual(word_index.find_word_indices('XYZ'), [])
+  
+  def test_import_numpy(self):
+    import numbers
+    letters.import_numpy.__wrapped__()
+    self.assertIs(sys.modules['numbers'], numbers)
+    self.assertTrue(hasattr(numbers, 'Expression'))
+  
+  def test_word_index_file(self):
+    with tempfile.TemporaryDirectory() as directory_name:
+      word_list_file_name = os.path.join(directory_name, 'words.txt')
+      index_file_name = f'{word_list_file_name}.index'
+      with open(word_list_file_name, 'w', encoding='UTF-8') as word_list_file:
+        word_list_file.write('radar\na\ndarn\naa\nrad\ndraw\nard\nda\n')
+      
+      self.assertIsNone(
+        letters.open_word_index(word_list_file_name, index_file_name)
+      )
+      
+      letters.write_word_index_file(word_list_file_name, index_file_name)
+      word_index = \
+              letters.open_word_index(word_list_file_name, index_file_name)
+      self.assertEqual(len(word_index.word_list), 8)
+      self.assertEqual(word_index.word_list[0], 'RADAR')
+      self.assertEqual(list(word_index.get('ADR')), [4, 6])
+      self.assertIsNone(word_index.get('XYZ'))
+      self.assertEqual(
+        letters.compute_valid_word_list(
+          word_index.word_list,
+          'DARN',
+          word_index,
+        ),
+        ['A', 'DARN', 'RAD', 'ARD', 'DA'],
+      )
+      
+      with open(word_list_file_name, 'a', encoding='UTF-8') as word_list_file:
+        word_list_file.write('and\n')
+      word_index = \
+              letters.open_word_index(word_list_file_name, index_file_name)
+      self.assertEqual(len(word_index.word_list), 9)
+      self.assertEqual(
+        letters.compute_valid_word_list(
+          word_index.word_list,
+          'DARN',
+          word_index,
+        ),
+        ['A', 'DARN', 'RAD', 'ARD', 'DA', 'AND'],
+      )
+      self.assertEqual(len(word_index), 8)
+      self.assertEqual(
+        list(word_index.items())[:2],
+        [('A', word_index.get('A')), ('AA', word_index.get('AA'))],
+      )
+      
+      with open(index_file_name, 'rb') as index_file:
+        index_bytes = index_file.read()
+      for bad_index_bytes in [
+        b'',
+        index_bytes[:10],
+        index_bytes[:-1],
+        index_bytes[:4] + b'\xff' + index_bytes[5:],
+      ]:
+        with open(index_file_name, 'wb') as index_file:
+          index_file.write(bad_index_bytes)
+        word_index = \
+                letters.open_word_index(word_list_file_name, index_file_name)
+        self.assertEqual(len(word_index.word_list), 9)
+        with open(index_file_name, 'rb') as index_file:
+          self.assertEqual(index_file.read(), index_bytes)
 
 
 if __name__ == '__main__':
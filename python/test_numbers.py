@@ -31,12 +31,84 @@ Basically:
 """
 
 
+import concurrent.futures
+import io
 import numbers as n
+import os
+import tempfile
 import unittest
 
 
 class TestNumbers(unittest.TestCase):
   
+  def test_divide(self):
+    
+    self.assertEqual(n.divide(6, 3), 2)
+    self.assertEqual(n.divide(1000, 8), 125)
+    self.assertIsInstance(n.divide(6, 3), int)
+    self.assertEqual(n.divide(7 * 10 ** 30, 7), 10 ** 30)
+    
+    self.assertEqual(n.divide(5, 2), 5 / 2)
+    self.assertEqual(n.divide(2, 3), 2 / 3)
+  
+  def test_might_be_useful(self):
+    
+    _12 = n.Expression(12)
+    _5 = n.Expression(5)
+    _4 = n.Expression(4)
+    _1 = n.Expression(1)
+    
+    self.assertTrue(n.might_be_useful(_12, _4, n.DIVIDE))
+    self.assertFalse(n.might_be_useful(_12, _5, n.DIVIDE))
+    self.assertFalse(n.might_be_useful(_4, _12, n.DIVIDE))
+    self.assertFalse(n.might_be_useful(_12, _1, n.DIVIDE))
+    
+    self.assertTrue(n.might_be_useful(_12, _5, n.MULTIPLY))
+    self.assertFalse(n.might_be_useful(_12, _1, n.MULTIPLY))
+    self.assertTrue(n.might_be_useful(_12, _12, n.ADD))
+    self.assertFalse(n.might_be_useful(_12, _12, n.SUBTRACT))
+  
+  def test_is_canonical_combination(self):
+    
+    _7 = n.Expression(7)
+    _5 = n.Expression(5)
+    _3 = n.Expression(3)
+    _2 = n.Expression(2)
+    _7_a_5 = n.Expression(_7, _5, n.ADD)
+    _7_a_3 = n.Expression(_7, _3, n.ADD)
+    _7_s_3 = n.Expression(_7, _3, n.SUBTRACT)
+    _5_s_3 = n.Expression(_5, _3, n.SUBTRACT)
+    _7_m_5 = n.Expression(_7, _5, n.MULTIPLY)
+    
+    self.assertTrue(n.is_canonical_combination(_7, _5, n.ADD))
+    self.assertTrue(n.is_canonical_combination(_7_a_5, _3, n.ADD))
+    self.assertTrue(n.is_canonical_combination(_7_a_5, _3, n.SUBTRACT))
+    self.assertTrue(n.is_canonical_combination(_7_a_5, _2, n.MULTIPLY))
+    self.assertTrue(n.is_canonical_combination(_7_m_5, _3, n.ADD))
+    self.assertFalse(n.is_canonical_combination(_7, _5_s_3, n.ADD))
+    self.assertFalse(n.is_canonical_combination(_7_a_3, _5, n.ADD))
+    self.assertFalse(n.is_canonical_combination(_7_s_3, _5, n.ADD))
+    self.assertFalse(n.is_canonical_combination(_7_s_3, _5, n.SUBTRACT))
+    self.assertTrue(n.is_canonical_combination(_7_m_5, _3, n.MULTIPLY))
+    self.assertFalse(
+      n.is_canonical_combination(
+        n.Expression(_7, _3, n.MULTIPLY),
+        _5,
+        n.MULTIPLY,
+      )
+    )
+    
+    for child_1, child_2, binary_operator in [
+      (_7, _5, n.SUBTRACT),
+      (_7_a_5, _3, n.SUBTRACT),
+      (_7_m_5, _3, n.ADD),
+      (_7_m_5, _5, n.DIVIDE),
+    ]:
+      self.assertEqual(
+        n.Expression.extend(child_1, child_2, binary_operator),
+        n.Expression.canonicalise(child_1, child_2, binary_operator),
+      )
+  
   def test_is_positive_integer(self):
     
     self.assertTrue(n.is_positive_integer(1))
@@ -48,6 +120,12 @@ class TestNumbers(unittest.TestCase):
     self.assertFalse(n.is_positive_integer(-1))
     self.assertFalse(n.is_positive_integer(2/3))
     self.assertFalse(n.is_positive_integer(7.77))
+    
+    _7 = n.Expression(7)
+    _2 = n.Expression(2)
+    self.assertFalse(
+      n.is_positive_integer(n.Expression(_7, _2, n.DIVIDE).value)
+    )
   
   def test_expression(self):
     
@@ -77,13 +155,13 @@ class TestNumbers(unittest.TestCase):
       (9 - 4) * (2 + 2) / (3 * 2 - 5 / 2)
     )
     
-    self.assertEqual(_2_a_2.constants, [2, 2])
-    self.assertEqual(_9_s_4.constants, [9, 4])
-    self.assertEqual(_3_m_2.constants, [3, 2])
-    self.assertEqual(_5_d_2.constants, [5, 2])
+    self.assertEqual(_2_a_2.constants, (2, 2))
+    self.assertEqual(_9_s_4.constants, (9, 4))
+    self.assertEqual(_3_m_2.constants, (3, 2))
+    self.assertEqual(_5_d_2.constants, (5, 2))
     self.assertEqual(
       _2_a_2_mm_9_s_4_dd_3_m_2_s_5_d_2.constants,
-      [2, 2, 9, 4, 3, 2, 5, 2]
+      (2, 2, 9, 4, 3, 2, 5, 2)
     )
     
     self.assertEqual(_2_a_2.parts, (_2, _2))
@@ -100,6 +178,13 @@ class TestNumbers(unittest.TestCase):
     self.assertEqual(_3_m_2.signs, (1, 1))
     self.assertEqual(_5_d_2.signs, (1, -1))
     self.assertEqual(_2_a_2_mm_9_s_4_dd_3_m_2_s_5_d_2.signs, (1, 1, -1))
+    
+    self.assertIsNone(_9_s_4.rank_cached)
+    self.assertIsNone(_9_s_4.string_cached)
+    self.assertEqual(_9_s_4.depth, 1)
+    self.assertEqual(_9_s_4.rank, (2, 1, 2, (_9.rank, _4.rank), -5, 1))
+    self.assertEqual(str(_9_s_4), '9 - 4')
+    self.assertEqual(_9_s_4.string_cached, '9 - 4')
   
   def test_expression_equal(self):
     
@@ -201,6 +286,94 @@ class TestNumbers(unittest.TestCase):
     _6_a_4_m_3_m_2 = n.Expression(_6, _4_m_3_m_2, n.ADD)
     self.assertLess(_6_a_4_m_3_m_2, _6_a_4_m_3_a_2)
   
+  def test_parse_expression(self):
+    
+    for expression in n.compute_expression_set([75, 50, 2, 3, 3]):
+      parsed_expression = n.parse_expression(str(expression))
+      self.assertEqual(parsed_expression, expression)
+      self.assertEqual(parsed_expression.rank, expression.rank)
+    
+    cached_expression = n.CachedExpression(10, '5 * 2')
+    self.assertIsNone(cached_expression.rank_cached)
+    self.assertEqual(cached_expression.rank, n.parse_expression('2 * 5').rank)
+    self.assertLess(cached_expression, n.CachedExpression(10, '5 + 3 + 2'))
+  
+  def test_expression_store(self):
+    
+    expression_store = n.ExpressionStore()
+    
+    _2 = expression_store.constant(2)
+    _3 = expression_store.constant(3)
+    _4 = expression_store.constant(4)
+    self.assertIs(expression_store.constant(2), _2)
+    self.assertEqual(_2, n.Expression(2))
+    
+    _2_a_3 = expression_store.combine(_2, _3, n.ADD)
+    self.assertIs(expression_store.combine(_3, _2, n.ADD), _2_a_3)
+    self.assertEqual(_2_a_3, n.Expression(_2, _3, n.ADD))
+    self.assertEqual(str(_2_a_3), '3 + 2')
+    self.assertEqual(_2_a_3.value, 5)
+    self.assertEqual(_2_a_3.mass, 2)
+    
+    _2_a_3_s_4 = expression_store.combine(_2_a_3, _4, n.SUBTRACT)
+    _2_s_4_a_3 = \
+            expression_store.combine(
+              expression_store.combine(_2, _4, n.SUBTRACT),
+              _3,
+              n.ADD,
+            )
+    self.assertIs(_2_a_3_s_4, _2_s_4_a_3)
+    self.assertEqual(_2_a_3_s_4, n.Expression(_2_a_3, _4, n.SUBTRACT))
+    self.assertIsNot(expression_store.combine(_2, _3, n.MULTIPLY), _2_a_3)
+    
+    expression_count = len(expression_store)
+    expression_store.discard(_2_a_3_s_4)
+    self.assertEqual(len(expression_store), expression_count - 1)
+    self.assertIsNot(
+      expression_store.combine(_2_a_3, _4, n.SUBTRACT),
+      _2_a_3_s_4,
+    )
+    
+    expression_set = n.compute_expression_set([2, 2, 3])
+    expression_store = n.ExpressionStore()
+    self.assertEqual(
+      {
+        expression
+          for _, expression_set_for_mask in n.generate_expression_sets(
+            [2, 2, 3],
+            expression_store=expression_store,
+          )
+          for expression in expression_set_for_mask
+      },
+      expression_set,
+    )
+  
+  def test_select_representatives(self):
+    
+    _6 = n.Expression(6)
+    _4 = n.Expression(4)
+    _2 = n.Expression(2)
+    _6_a_4 = n.Expression(_6, _4, n.ADD)
+    _6_a_4_a_2 = n.Expression(_6_a_4, _2, n.ADD)
+    _6_m_4_d_2 = n.Expression(n.Expression(_6, _4, n.MULTIPLY), _2, n.DIVIDE)
+    _6_m_2 = n.Expression(_6, _2, n.MULTIPLY)
+    
+    expression_set = {_6, _6_a_4, _6_a_4_a_2, _6_m_4_d_2, _6_m_2}
+    
+    self.assertCountEqual(
+      n.select_representatives(expression_set, 1),
+      [_6, _6_a_4, _6_a_4_a_2, _6_m_2],
+    )
+    self.assertCountEqual(
+      n.select_representatives(expression_set, 2),
+      expression_set,
+    )
+    
+    self.assertEqual(
+      n.solve([75, 50, 2, 2, 5], 11, 1, max_alternatives_count=1),
+      n.solve([75, 50, 2, 2, 5], 11, 1),
+    )
+  
   def test_compute_expression_set(self):
     
     self.assertCountEqual(
@@ -664,6 +837,559 @@ class TestNumbers(unittest.TestCase):
           # (3 - 1) / (2 - 1), redundant
       ]
     )
+  
+  def test_compute_hit_set(self):
+    
+    _20 = n.Expression(20)
+    _3 = n.Expression(3)
+    _20_m_3 = n.Expression(_20, _3, n.MULTIPLY)
+    
+    self.assertCountEqual(
+      n.compute_hit_set([3, 20, 10000], 60, 1),
+      [_20_m_3]
+    )
+    self.assertCountEqual(
+      n.compute_hit_set([3, 20, 10000], 21, 2, tolerance=2),
+      [_20, n.Expression(_20, _3, n.ADD)]
+    )
+    
+    input_number_list = [75, 50, 2, 2, 5]
+    target = 215
+    hit_set = n.compute_hit_set(input_number_list, target, 1000)
+    self.assertCountEqual(
+      hit_set,
+      [
+        expression
+          for expression in n.compute_expression_set(input_number_list)
+          if expression.value == target
+      ]
+    )
+  
+  def test_compute_target_hit_set(self):
+    
+    for input_number_list, target, tolerance in [
+      ([3, 7], 21, 0),
+      ([1, 1, 1, 2], 3, 1),
+      ([75, 50, 2, 2, 5], 213, 0),
+      ([75, 50, 2, 2, 5], 215, 3),
+      ([100, 75, 50, 25, 6, 3], 952, 0),
+    ]:
+      for max_alternatives_count in [None, 1]:
+        self.assertEqual(
+          n.compute_target_hit_set(
+            input_number_list,
+            target,
+            tolerance,
+            max_alternatives_count,
+          ),
+          {
+            expression
+              for expression in
+                n.compute_expression_set(
+                  input_number_list,
+                  max_alternatives_count,
+                )
+              if abs(expression.value - target) <= tolerance
+          },
+        )
+    
+    self.assertEqual(n.compute_target_hit_set([3, 7], 5), set())
+    self.assertEqual(
+      n.compute_target_hit_set([3, 7], 10, deadline=n.Deadline(0)),
+      set(),
+    )
+    self.assertEqual(
+      n.solve([75, 50, 2, 2, 5], 100, 5, engine=n.ENGINE_TARGET),
+      n.solve([75, 50, 2, 2, 5], 100, 5),
+    )
+    self.assertRaises(ValueError, n.solve, [3, 7], 10, engine='backward')
+  
+  def test_compute_closest_expression_list(self):
+    
+    input_number_list = [75, 50, 2, 2, 5]
+    target = 213
+    
+    for max_alternatives_count in [None, 1]:
+      closest_expression_list = \
+              n.select_closest(
+                n.compute_expression_set(
+                  input_number_list,
+                  max_alternatives_count,
+                ),
+                target,
+                20,
+              )
+      for jobs_count in [1, 3]:
+        self.assertEqual(
+          n.compute_closest_expression_list(
+            input_number_list,
+            target,
+            20,
+            max_alternatives_count,
+            jobs_count,
+          ),
+          closest_expression_list,
+        )
+  
+  def test_compute_split_task_lists(self):
+    
+    input_number_list = [75, 50, 2, 2, 5]
+    expression_set_from_mask = \
+            dict(n.generate_expression_sets(input_number_list, max_mass=3))
+    
+    for max_alternatives_count in [None, 1]:
+      task_lists = \
+              n.compute_split_task_lists(
+                input_number_list,
+                max_alternatives_count,
+                expression_set_from_mask,
+                3,
+              )
+      self.assertEqual(len(task_lists), 3)
+      task_list = [task for task_list in task_lists for task in task_list]
+      mask_list = sorted({task[0] for task in task_list})
+      # 75 50 2 5 is computed once, for mask 27 rather than mask 23
+      self.assertEqual(mask_list, [15, 27, 29, 30, 31])
+      self.assertCountEqual(
+        [
+          mask_1
+            for mask, mask_1_list, _, _ in task_list
+            if mask == 31
+            for mask_1 in mask_1_list
+        ],
+        [
+          mask_1
+            for mask_1 in
+              n.compute_split_list(
+                31,
+                n.compute_multiset_from_mask(input_number_list),
+              )
+            if 1 < mask_1.bit_count() < 4
+        ],
+      )
+      for mask, mask_1_list, mask_right_list, mask_left_list in task_list:
+        if mask != 31:
+          self.assertEqual(mask_right_list, [31 ^ mask])
+          self.assertEqual(mask_left_list, [31 ^ mask])
+      self.assertEqual(
+        len([task for task in task_list if task[0] == 27]),
+        14 if max_alternatives_count is None else 1,
+      )
+  
+  def test_deadline(self):
+    
+    deadline = n.Deadline(60)
+    self.assertFalse(deadline.has_expired())
+    self.assertFalse(deadline.expired)
+    
+    deadline = n.Deadline(0)
+    self.assertTrue(deadline.has_expired())
+    self.assertTrue(deadline.expired)
+  
+  def test_compute_mask_list(self):
+    
+    self.assertEqual(n.compute_mask_list([1, 10, 5]), [2, 4, 1, 6, 3, 5, 7])
+    self.assertEqual(n.compute_mask_list([1, 10, 5], 1), [2, 4, 1])
+  
+  def test_compute_split_list(self):
+    
+    multiset_from_mask = n.compute_multiset_from_mask([2, 5, 2])
+    self.assertEqual(multiset_from_mask[0b101], (2, 2))
+    self.assertEqual(multiset_from_mask[0b111], (2, 2, 5))
+    
+    self.assertEqual(n.compute_split_list(0b101, multiset_from_mask), [0b100])
+    self.assertEqual(
+      n.compute_split_list(0b111, multiset_from_mask),
+      [0b110, 0b101, 0b100, 0b010],
+    )
+  
+  def test_expression_set_memo(self):
+    
+    memo = n.ExpressionSetMemo()
+    expression_set = n.compute_expression_set([2, 5, 2], memo=memo)
+    self.assertEqual(expression_set, n.compute_expression_set([2, 2, 5]))
+    self.assertEqual(len(memo), 5)
+    self.assertEqual(memo.get((5,)), {n.Expression(5)})
+    self.assertEqual(
+      memo.get((2, 5)),
+      n.compute_expression_set([2, 5]) - {n.Expression(2), n.Expression(5)},
+    )
+    self.assertIsNone(memo.get((2, 5), 1))
+    
+    statistics = n.SolveStatistics()
+    self.assertEqual(
+      n.solve([5, 2, 2, 3], 24, memo=memo, statistics=statistics),
+      n.solve([5, 2, 2, 3], 24),
+    )
+    self.assertEqual(statistics.field_values_from_mass[2]['pairs'], 2 * 8)
+    self.assertEqual(len(memo), 11)
+    
+    self.assertEqual(
+      n.solve([2, 5, 2, 3], 24, jobs_count=2, memo=memo),
+      n.solve([5, 2, 2, 3], 24),
+    )
+  
+  def test_solve_deadline(self):
+    
+    input_number_list = [75, 50, 2, 2, 5]
+    target = 213
+    
+    for jobs_count in [1, 3]:
+      
+      deadline = n.Deadline(60)
+      self.assertEqual(
+        n.solve(
+          input_number_list,
+          target,
+          jobs_count=jobs_count,
+          deadline=deadline,
+        ),
+        n.solve(input_number_list, target),
+      )
+      self.assertFalse(deadline.expired)
+      
+      deadline = n.Deadline(0)
+      self.assertCountEqual(
+        n.solve(
+          input_number_list,
+          target,
+          jobs_count=jobs_count,
+          deadline=deadline,
+        ),
+        [n.Expression(number) for number in [75, 50, 2, 5]],
+      )
+      self.assertTrue(deadline.expired)
+    
+    deadline = n.Deadline(0)
+    self.assertEqual(
+      n.solve(input_number_list, target, first_only=True, deadline=deadline),
+      [],
+    )
+    self.assertTrue(deadline.expired)
+  
+  def test_incremental_solver(self):
+    
+    input_number_list = [75, 50, 2, 2, 5]
+    
+    for max_alternatives_count in [None, 1]:
+      statistics = n.SolveStatistics()
+      incremental_solver = \
+              n.IncrementalSolver(max_alternatives_count, statistics)
+      self.assertEqual(incremental_solver.solve(10, 5), [])
+      for count in range(1, len(input_number_list) + 1):
+        incremental_solver.add_number(input_number_list[count - 1])
+        for target in [1, 52, 213, 1000]:
+          for max_results_count in [1, 20]:
+            self.assertEqual(
+              incremental_solver.solve(target, max_results_count),
+              n.compute_closest_expression_list(
+                input_number_list[:count],
+                target,
+                max_results_count,
+                max_alternatives_count,
+              ),
+            )
+      
+      full_statistics = n.SolveStatistics()
+      n.compute_expression_set(
+        input_number_list,
+        max_alternatives_count,
+        full_statistics,
+      )
+      self.assertEqual(
+        statistics.get_total('pairs'),
+        full_statistics.get_total('pairs'),
+      )
+  
+  def test_solve_statistics(self):
+    
+    input_number_list = [75, 50, 2, 2, 5]
+    
+    statistics = n.SolveStatistics()
+    expression_set = \
+            n.compute_expression_set(input_number_list, None, statistics)
+    self.assertEqual(
+      sorted(statistics.field_values_from_mass),
+      [1, 2, 3, 4, 5],
+    )
+    self.assertEqual(statistics.get_total('masks'), 31)
+    self.assertEqual(statistics.field_values_from_mass[1]['candidates'], 4)
+    self.assertEqual(statistics.field_values_from_mass[1]['built'], 4)
+    self.assertEqual(statistics.field_values_from_mass[2]['pairs'], 52)
+    self.assertEqual(statistics.get_total('pruned'), 0)
+    self.assertEqual(statistics.get_total('duplicates'), 0)
+    self.assertEqual(
+      statistics.get_total('pairs'),
+      statistics.get_total('rejected')
+        + statistics.get_total('candidates')
+        - len(set(input_number_list)),
+    )
+    self.assertEqual(
+      statistics.get_total('candidates'),
+      statistics.get_total('built') + statistics.get_total('duplicates'),
+    )
+    self.assertLessEqual(len(expression_set), statistics.get_total('built'))
+    
+    pruned_statistics = n.SolveStatistics()
+    n.compute_expression_set(input_number_list, 1, pruned_statistics)
+    self.assertGreater(pruned_statistics.get_total('pruned'), 0)
+    
+    for jobs_count in [1, 3]:
+      jobs_statistics = n.SolveStatistics()
+      n.compute_closest_expression_list(
+        input_number_list,
+        213,
+        20,
+        jobs_count=jobs_count,
+        statistics=jobs_statistics,
+      )
+      for field_name in ['masks', 'pairs', 'rejected', 'candidates']:
+        self.assertEqual(
+          jobs_statistics.get_total(field_name),
+          statistics.get_total(field_name),
+        )
+      jobs_statistics = n.SolveStatistics()
+      n.compute_closest_expression_list(
+        input_number_list,
+        213,
+        20,
+        1,
+        jobs_count=jobs_count,
+        statistics=jobs_statistics,
+      )
+      # Workers may build the same full-mask expression more than once
+      for mass in range(1, len(input_number_list)):
+        self.assertEqual(
+          jobs_statistics.field_values_from_mass[mass]['pruned'],
+          pruned_statistics.field_values_from_mass[mass]['pruned'],
+        )
+    
+    line_list = statistics.format().split('\n')
+    self.assertEqual(
+      line_list[0].split('\t'),
+      ['mass', *n.SolveStatistics.FIELD_NAMES],
+    )
+    self.assertEqual(len(line_list), 7)
+    self.assertTrue(line_list[-1].startswith('total\t31\t'))
+  
+  def test_solution_cache(self):
+    
+    def solve_strings(input_number_list, target, **option_from_name):
+      return [
+        (expression.value, str(expression))
+          for expression in
+            n.solve(input_number_list, target, **option_from_name)
+      ]
+    
+    with tempfile.TemporaryDirectory() as directory_name:
+      
+      cache = n.SolutionCache(os.path.join(directory_name, 'cache.db'), 2)
+      self.assertEqual(len(cache), 0)
+      self.assertIsNone(cache.get([5, 2, 3], 10, 1))
+      
+      for target in [10, 23, 100]:
+        self.assertEqual(
+          solve_strings([5, 2, 3], target, cache=cache),
+          solve_strings([5, 2, 3], target),
+        )
+        self.assertEqual(
+          solve_strings([3, 5, 2], target, max_results_count=3, cache=cache),
+          solve_strings([5, 2, 3], target, max_results_count=3),
+        )
+      self.assertEqual(len(cache), 1)
+      self.assertIsInstance(cache.get([2, 3, 5], 10, 1)[0], n.CachedExpression)
+      
+      n.solve([7, 1], 8, first_only=True, cache=cache)
+      n.solve([7, 1], 8, max_alternatives_count=1, cache=cache)
+      n.solve([7, 1], 8, max_results_count=31, cache=cache)
+      n.solve([7, 1], 8, deadline=n.Deadline(0), cache=cache)
+      self.assertIsNone(cache.get([7, 1], 8, 1))
+      
+      n.solve([7, 1], 8, cache=cache)
+      cache.get([5, 2, 3], 10, 1)
+      n.solve([4], 4, cache=cache)
+      self.assertEqual(len(cache), 2)
+      self.assertIsNone(cache.get([7, 1], 8, 1))
+      self.assertIsNotNone(cache.get([5, 2, 3], 10, 1))
+      
+      for target in [0, 63, 64, 127, 128, 500, 3751, 20000]:
+        for max_results_count in [1, 30]:
+          self.assertEqual(
+            solve_strings(
+              [75, 50, 2, 3],
+              target,
+              max_results_count=max_results_count,
+              cache=cache,
+            ),
+            solve_strings(
+              [75, 50, 2, 3],
+              target,
+              max_results_count=max_results_count,
+            ),
+          )
+      
+      # Another process replaces the only draw in the middle of a get
+      racing_cache = \
+              n.SolutionCache(os.path.join(directory_name, 'racing.db'), 1)
+      other_cache = n.SolutionCache(racing_cache.file_name, 1)
+      racing_cache.put([5, 2, 3], n.compute_expression_set([5, 2, 3]))
+      connect = racing_cache.connect
+      
+      class RacingConnection:
+        def __init__(self):
+          self.connection = connect()
+        def execute(self, query, *argument_list):
+          cursor = self.connection.execute(query, *argument_list)
+          if query.startswith('SELECT id'):
+            other_cache.put([7, 1], n.compute_expression_set([7, 1]))
+          return cursor
+        def close(self):
+          self.connection.close()
+      
+      racing_cache.connect = RacingConnection
+      self.assertEqual(
+        [
+          str(expression)
+            for expression in
+              n.select_closest(racing_cache.get([5, 2, 3], 10, 1), 10, 1)
+        ],
+        ['5 * 2'],
+      )
+      racing_cache.connect = connect
+      self.assertIsNone(racing_cache.get([5, 2, 3], 10, 1))
+      
+      shared_cache = \
+              n.SolutionCache(os.path.join(directory_name, 'shared.db'), 10)
+      input_number_list_list = [[5, 2, 3, index] for index in range(1, 7)]
+      with concurrent.futures.ProcessPoolExecutor(3) as executor:
+        future_list = [
+          executor.submit(
+            shared_cache.put,
+            input_number_list,
+            n.compute_expression_set(input_number_list),
+          )
+            for input_number_list in input_number_list_list
+        ]
+        for future in future_list:
+          future.result()
+      self.assertEqual(len(shared_cache), 6)
+      for input_number_list in input_number_list_list:
+        self.assertEqual(
+          solve_strings(input_number_list, 100, cache=shared_cache),
+          solve_strings(input_number_list, 100),
+        )
+  
+  def test_answer_query(self):
+    
+    self.assertEqual(
+      n.answer_query({'target': 10, 'numbers': [5, 2], 'max_results': 2}),
+      {'results': [[10, '5 * 2'], [7, '5 + 2']]},
+    )
+    self.assertEqual(
+      n.answer_query(
+        {'target': 10, 'numbers': [5, 2], 'first_only': True},
+        max_results_count=5,
+      ),
+      {'results': [[10, '5 * 2']]},
+    )
+    self.assertEqual(
+      n.answer_query({'target': 213, 'numbers': [75, 50, 2, 2, 5]}),
+      {
+        'results': [
+          [expression.value, str(expression)]
+            for expression in n.solve([75, 50, 2, 2, 5], 213)
+        ],
+      },
+    )
+    
+    for query in [
+      {'target': 0, 'numbers': [1]},
+      {'target': 10, 'numbers': []},
+      {'target': 10, 'numbers': [5, 2.5]},
+      {'target': 10, 'numbers': '52'},
+      {'target': 10, 'numbers': [1] * (n.MAX_QUERY_NUMBERS_COUNT + 1)},
+    ]:
+      self.assertRaises(ValueError, n.answer_query, query)
+    for key, value in [
+      ('max_results', 0),
+      ('max_results', '2'),
+      ('max_alternatives', 0),
+      ('first_only', 1),
+      ('tolerance', -1),
+      ('engine', 'backward'),
+      ('time_limit', 0),
+      ('time_limit', True),
+    ]:
+      self.assertRaises(
+        ValueError,
+        n.answer_query,
+        {'target': 10, 'numbers': [5, 2], key: value},
+      )
+    self.assertRaises(KeyError, n.answer_query, {'target': 10})
+    
+    self.assertEqual(
+      n.answer_query(
+        {'target': 10, 'numbers': [5, 2], 'max_results': 1},
+        time_limit=60,
+      ),
+      {'results': [[10, '5 * 2']], 'partial': False},
+    )
+    self.assertEqual(
+      n.answer_query(
+        {'target': 10, 'numbers': [5, 2], 'max_alternatives': None},
+        max_results_count=1,
+        max_alternatives_count=1,
+      ),
+      {'results': [[10, '5 * 2']]},
+    )
+  
+  def test_parse_game_line(self):
+    
+    self.assertEqual(
+      n.parse_game_line('420 75 50 6 9 4 2\n'),
+      {'target': 420, 'numbers': [75, 50, 6, 9, 4, 2]},
+    )
+    self.assertEqual(
+      n.parse_game_line(' 10\t5 '),
+      {'target': 10, 'numbers': [5]},
+    )
+    self.assertRaises(ValueError, n.parse_game_line, '10 five')
+  
+  def test_reachability_table(self):
+    
+    _7 = n.Expression(7)
+    _3 = n.Expression(3)
+    
+    reachability_table = n.ReachabilityTable.compute([7, 3])
+    self.assertEqual(
+      reachability_table.expression_from_value,
+      {
+        3: _3,
+        4: n.Expression(_7, _3, n.SUBTRACT),
+        7: _7,
+        10: n.Expression(_7, _3, n.ADD),
+        21: n.Expression(_7, _3, n.MULTIPLY),
+      }
+    )
+    self.assertEqual(
+      reachability_table.lookup(10),
+      (10, reachability_table.expression_from_value[10])
+    )
+    self.assertEqual(reachability_table.lookup(1)[0], 3)
+    self.assertEqual(reachability_table.lookup(5)[0], 4)
+    self.assertEqual(reachability_table.lookup(16)[0], 21)
+    self.assertEqual(reachability_table.lookup(1000)[0], 21)
+    
+    table_file = io.StringIO()
+    reachability_table.write(table_file)
+    self.assertEqual(
+      table_file.getvalue(),
+      '3\t3\n4\t7 - 3\n7\t7\n10\t7 + 3\n21\t7 * 3\n'
+    )
+    table_file.seek(0)
+    read_reachability_table = n.ReachabilityTable.read(table_file)
+    self.assertEqual(read_reachability_table.lookup(9), (10, '7 + 3'))
+    self.assertIsNone(n.ReachabilityTable({}).lookup(9))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+"""
+# test_solvability.py
+
+Perform unit testing for `solvability.py`.
+
+Copyright 2022 Conway
+Licensed under the GNU General Public License v3.0 (GPL-3.0-only).
+This is free software with NO WARRANTY etc. etc., see LICENSE.
+"""
+
+
+import numbers as n
+import os
+import solvability
+import tempfile
+import unittest
+
+
+POOL = [1, 1, 2, 3, 25]
+DRAW_SIZE = 3
+TARGET_MIN = 5
+TARGET_MAX = 30
+
+
+class TestSolvability(unittest.TestCase):
+  
+  def test_generate_draws(self):
+    self.assertEqual(
+      solvability.generate_draws([1, 1, 2], 2),
+      [(1, 1), (1, 2)],
+    )
+    self.assertEqual(
+      len(solvability.generate_draws(solvability.POOL, solvability.DRAW_SIZE)),
+      13243,
+    )
+  
+  def test_compute_draw_index(self):
+    for pool, draw_size in [
+      ([1, 1, 2], 2),
+      (POOL, DRAW_SIZE),
+      (solvability.POOL, solvability.DRAW_SIZE),
+    ]:
+      for draw_index, draw in enumerate(
+        solvability.generate_draws(pool, draw_size)
+      ):
+        self.assertEqual(
+          solvability.compute_draw_index(pool, draw_size, draw),
+          draw_index,
+        )
+    self.assertIsNone(solvability.compute_draw_index(POOL, DRAW_SIZE, (1, 1)))
+    self.assertIsNone(
+      solvability.compute_draw_index(POOL, DRAW_SIZE, (1, 1, 1))
+    )
+    self.assertIsNone(
+      solvability.compute_draw_index(POOL, DRAW_SIZE, (1, 2, 4))
+    )
+  
+  def test_build_assemble_query(self):
+    
+    parameter_list = [POOL, DRAW_SIZE, TARGET_MIN, TARGET_MAX]
+    
+    with tempfile.TemporaryDirectory() as directory_name:
+      
+      work_directory_name = os.path.join(directory_name, 'work')
+      database_file_name = os.path.join(directory_name, 'database')
+      
+      solvability.build_shard(work_directory_name, 0, 2, *parameter_list)
+      with self.assertRaises(ValueError):
+        solvability.assemble_database(
+          work_directory_name,
+          database_file_name,
+          *parameter_list,
+        )
+      
+      shard_file_name = \
+              os.path.join(work_directory_name, 'shard-1-of-2.tsv')
+      with open(shard_file_name, 'w', encoding='UTF-8') as shard_file:
+        shard_file.write('1\t5=partial')
+      solvability.build_shard(work_directory_name, 1, 2, *parameter_list)
+      
+      solvability.assemble_database(
+        work_directory_name,
+        database_file_name,
+        *parameter_list,
+      )
+      
+      with open(database_file_name, 'rb') as database_file:
+        for draw in solvability.generate_draws(POOL, DRAW_SIZE):
+          reachability_table = n.ReachabilityTable.compute(list(draw))
+          for target in range(TARGET_MIN, TARGET_MAX + 1):
+            expression = \
+                    reachability_table.expression_from_value.get(target)
+            self.assertEqual(
+              solvability.query_database(database_file, target, draw[::-1]),
+              None if expression is None else str(expression),
+            )
+        with self.assertRaises(ValueError):
+          solvability.query_database(database_file, 10, [3, 3, 3])
+        with self.assertRaises(ValueError):
+          solvability.query_database(database_file, 31, [1, 2, 3])
+
+
+if __name__ == '__main__':
+  
+  unittest.main()